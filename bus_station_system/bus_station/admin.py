@@ -6,6 +6,7 @@ from .models import (
     Destination, BusModel, Bus, Route,
     FuelPrice, Trip, Ticket
 )
+from . import utils
 
 
 @admin.register(Destination)
@@ -24,6 +25,7 @@ class BusModelAdmin(admin.ModelAdmin):
 @admin.register(Bus)
 class BusAdmin(admin.ModelAdmin):
     list_display = ['bus_model', 'number']
+    list_select_related = ['bus_model']
     list_filter = ['bus_model']
     search_fields = ['number', 'bus_model__name']
 
@@ -36,6 +38,10 @@ class TripInline(admin.TabularInline):
     can_delete = False
     max_num = 0
 
+    def get_queryset(self, request):
+        # Trip.__str__ виводить номер маршруту, Bus.__str__ - марку автобуса
+        return super().get_queryset(request).select_related('route', 'bus__bus_model')
+
 
 @admin.register(Route)
 class RouteAdmin(admin.ModelAdmin):
@@ -44,6 +50,7 @@ class RouteAdmin(admin.ModelAdmin):
         'departure_time', 'arrival_time', 'bus_model'
     ]
     list_filter = ['destination', 'bus_model', 'days_of_week']
+    list_select_related = ['destination', 'bus_model']
     search_fields = ['number', 'destination__name']
     inlines = [TripInline]
 
@@ -74,6 +81,10 @@ class TicketInline(admin.TabularInline):
     can_delete = False
     max_num = 0
 
+    def get_queryset(self, request):
+        # Назва рядка (__str__ квитка) виводить рейс з номером маршруту
+        return super().get_queryset(request).select_related('trip__route')
+
 
 @admin.register(Trip)
 class TripAdmin(admin.ModelAdmin):
@@ -82,24 +93,30 @@ class TripAdmin(admin.ModelAdmin):
         'seats_available', 'trip_status'
     ]
     list_filter = ['date', 'route__destination', 'bus__bus_model']
+    list_select_related = ['route__destination', 'bus__bus_model']
     search_fields = ['route__number', 'bus__number']
     readonly_fields = ['sold_tickets_count_display', 'seats_available_display']
+    autocomplete_fields = ['route', 'bus']
     inlines = [TicketInline]
 
+    def get_queryset(self, request):
+        # Лічильники квитків уже денормалізовані в рядку рейсу, тож достатньо
+        # підтягнути маршрут і автобус для __str__ та кількості місць
+        return super().get_queryset(request).select_related('route__destination', 'bus__bus_model')
+
     def sold_tickets_count(self, obj):
-        return obj.get_sold_tickets_count()
+        return obj.sold_count
 
     sold_tickets_count.short_description = 'Продано квитків'
 
     def seats_available(self, obj):
-        sold = obj.get_sold_tickets_count()
         total = obj.bus.bus_model.seats_count
-        return f"{sold}/{total}"
+        return f"{obj.sold_count}/{total}"
 
     seats_available.short_description = 'Місць (продано/всього)'
 
     def trip_status(self, obj):
-        sold = obj.get_sold_tickets_count()
+        sold = obj.sold_count
         total = obj.bus.bus_model.seats_count
         if sold == total:
             return format_html('<span style="color: red;">Повний</span>')
@@ -111,14 +128,12 @@ class TripAdmin(admin.ModelAdmin):
     trip_status.short_description = 'Статус'
 
     def sold_tickets_count_display(self, obj):
-        return obj.get_sold_tickets_count()
+        return obj.sold_count
 
     sold_tickets_count_display.short_description = 'Кількість проданих квитків'
 
     def seats_available_display(self, obj):
-        sold = obj.get_sold_tickets_count()
-        total = obj.bus.bus_model.seats_count
-        return f"{total - sold} з {total}"
+        return f"{obj.free_seats} з {obj.bus.bus_model.seats_count}"
 
     seats_available_display.short_description = 'Вільних місць'
 
@@ -132,15 +147,34 @@ class TripAdmin(admin.ModelAdmin):
     )
 
 
+class RouteListFilter(admin.SimpleListFilter):
+    """Фільтр квитків за маршрутом (усі маршрути з пунктами прибуття одним запитом)"""
+    title = 'Маршрут'
+    parameter_name = 'route'
+
+    def lookups(self, request, model_admin):
+        return [
+            (route.pk, str(route))
+            for route in Route.objects.select_related('destination').order_by('number')
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(trip__route_id=self.value())
+        return queryset
+
+
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
     list_display = [
         'ticket_number', 'trip', 'seat_number',
         'status', 'price', 'booking_time', 'is_expired_display'
     ]
-    list_filter = ['status', 'trip__date', 'trip__route']
+    list_filter = ['status', 'trip__date', RouteListFilter]
+    list_select_related = ['trip__route']
     search_fields = ['ticket_number', 'trip__route__number']
     readonly_fields = ['booking_time', 'sold_time', 'is_expired_display']
+    autocomplete_fields = ['trip']
 
     def is_expired_display(self, obj):
         if obj.status == 'booked' and obj.is_booking_expired():
@@ -153,9 +187,7 @@ class TicketAdmin(admin.ModelAdmin):
     is_expired_display.short_description = 'Статус бронювання'
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'trip__route', 'trip__bus'
-        )
+        return super().get_queryset(request).select_related('trip__route')
 
     fieldsets = (
         ('Основна інформація', {
@@ -169,17 +201,12 @@ class TicketAdmin(admin.ModelAdmin):
     actions = ['cancel_expired_bookings']
 
     def cancel_expired_bookings(self, request, queryset):
-        # Скасування прострочених бронювань
-        expired_count = 0
-        for ticket in queryset:
-            if ticket.status == 'booked' and ticket.is_booking_expired():
-                ticket.status = 'cancelled'
-                ticket.save()
-                expired_count += 1
+        # Скасування прострочених бронювань серед обраних квитків
+        cancelled_numbers = utils.cancel_expired_bookings(queryset)
 
         self.message_user(
             request,
-            f"Скасовано {expired_count} прострочених бронювань."
+            f"Скасовано {len(cancelled_numbers)} прострочених бронювань."
         )
 
     cancel_expired_bookings.short_description = "Скасувати прострочені бронювання"
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class BusStationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bus_station'
-    verbose_name = 'Система автовокзалу'
\ No newline at end of file
+    verbose_name = 'Система автовокзалу'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
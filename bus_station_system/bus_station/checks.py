@@ -0,0 +1,23 @@
+# bus_station/checks.py
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Бекенди, дані яких не бачать інші процеси
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Кеш за замовчуванням має бути спільним для всіх процесів"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        "Кеш за замовчуванням локальний для процесу",
+        hint=("Ціна пального, карти місць і версія даних звітів, оновлені в одному процесі, "
+              "не дійдуть до інших. Використайте DatabaseCache, Redis або Memcached."),
+        id='bus_station.W001',
+    )]
@@ -1,10 +1,11 @@
 # bus_station/context_processors.py
-from django.utils import timezone
-from .models import Trip, Ticket
+from django.utils.functional import SimpleLazyObject
+from .utils import get_station_stats
 
 def station_stats(request):
-    today = timezone.now().date()
+    # Лічильники рахуються лише тоді, коли шаблон справді їх виводить
+    stats = SimpleLazyObject(get_station_stats)
     return {
-        'today_trips_count': Trip.objects.filter(date=today).count(),
-        'today_tickets_count': Ticket.objects.filter(trip__date=today, status='sold').count(),
-    }
\ No newline at end of file
+        'today_trips_count': SimpleLazyObject(lambda: stats['trips']),
+        'today_tickets_count': SimpleLazyObject(lambda: stats['tickets']),
+    }
@@ -0,0 +1,81 @@
+# bus_station/exports.py
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import Ticket
+
+# Скільки рядків читається з бази за один раз при експорті
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Псевдофайл для csv.writer: повертає рядок замість запису"""
+
+    def write(self, value):
+        return value
+
+
+def wants_csv(request):
+    return request.GET.get('format') == 'csv'
+
+
+def csv_response(filename, header, rows):
+    """
+    Потокова CSV-відповідь: рядки формуються по одному під час відправлення,
+    тому пам'ять не залежить від розміру вибірки
+    """
+    writer = csv.writer(Echo())
+
+    def stream():
+        # BOM, щоб Excel правильно відкрив кирилицю
+        yield '\ufeff'
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _format_datetime(value):
+    return timezone.localtime(value).strftime('%d.%m.%Y %H:%M') if value else ''
+
+
+TICKET_EXPORT_HEADER = [
+    '№ квитка', 'Рейс', 'Пункт прибуття', 'Дата рейсу', 'Час відправлення',
+    'Місце', 'Ціна', 'Статус', 'Дата бронювання', 'Дата продажу'
+]
+
+
+def ticket_export_rows(queryset):
+    """Рядки CSV для квитків, прочитані порціями без створення об'єктів моделі"""
+    status_names = dict(Ticket.STATUS_CHOICES)
+    rows = queryset.values_list(
+        'ticket_number',
+        'trip__route__number',
+        'trip__route__destination__name',
+        'trip__date',
+        'trip__route__departure_time',
+        'seat_number',
+        'price',
+        'status',
+        'booking_time',
+        'sold_time'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    for (ticket_number, route_number, destination, trip_date, departure_time,
+         seat_number, price, status, booking_time, sold_time) in rows:
+        yield [
+            ticket_number,
+            route_number,
+            destination,
+            trip_date.strftime('%d.%m.%Y'),
+            departure_time.strftime('%H:%M'),
+            seat_number,
+            price,
+            status_names.get(status, status),
+            _format_datetime(booking_time),
+            _format_datetime(sold_time),
+        ]
@@ -1,33 +1,68 @@
 # bus_station/forms.py
+from datetime import timedelta
+
 from django import forms
-from .models import Ticket, Trip, FuelPrice
+from django.utils import timezone
+from .models import Destination, Trip, FuelPrice
 
 
-class TicketForm(forms.ModelForm):
-    class Meta:
-        model = Ticket
-        fields = ['trip', 'seat_number']
-        widgets = {
-            'trip': forms.Select(attrs={'class': 'form-select'}),
-            'seat_number': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
-        }
+class TicketForm(forms.Form):
+    """
+    Бронювання одного місця
+    Номер і зайнятість місця перевіряє лише сервіс бронювання (utils.book_seat)
+    під блокуванням рейсу; форма перевіряє тільки формат даних
+    """
+    trip = forms.ModelChoiceField(
+        label='Рейс',
+        queryset=Trip.objects.none(),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    seat_number = forms.IntegerField(
+        label='№ місця',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': 1})
+    )
+
 
-    def clean_seat_number(self):
-        seat_number = self.cleaned_data['seat_number']
-        trip = self.cleaned_data.get('trip')
+class GroupBookingForm(forms.Form):
+    """Групове бронювання: перелік місць або кількість місць поспіль"""
+    MAX_GROUP_SIZE = 60
 
-        if trip and seat_number:
-            if seat_number > trip.bus.bus_model.seats_count:
-                raise forms.ValidationError(
-                    f"Місце {seat_number} не існує. Максимальний номер: {trip.bus.bus_model.seats_count}"
-                )
+    trip = forms.ModelChoiceField(
+        label='Рейс',
+        queryset=Trip.objects.none(),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    seats = forms.CharField(
+        label='Місця', required=False,
+        help_text='Номери через кому, напр. 1, 2, 5',
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+    count = forms.IntegerField(
+        label='Або кількість місць поспіль', required=False,
+        min_value=1, max_value=MAX_GROUP_SIZE,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': 1})
+    )
 
-            # Перевірка чи місце вже зайняте
-            from .utils import is_seat_available
-            if not is_seat_available(trip, seat_number):
-                raise forms.ValidationError(f"Місце {seat_number} вже зайняте")
+    def clean_seats(self):
+        seats = self.cleaned_data['seats'].replace(' ', '')
+        if not seats:
+            return None
+        try:
+            seat_numbers = sorted({int(seat) for seat in seats.split(',') if seat})
+        except ValueError:
+            raise forms.ValidationError("Вкажіть номери місць цілими числами через кому")
+        if len(seat_numbers) > self.MAX_GROUP_SIZE:
+            raise forms.ValidationError(f"Не більше {self.MAX_GROUP_SIZE} місць за одне бронювання")
+        return seat_numbers
 
-        return seat_number
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('seats') and not cleaned_data.get('count'):
+            if not self.errors:
+                raise forms.ValidationError("Вкажіть місця або їх кількість")
+        elif cleaned_data.get('seats') and cleaned_data.get('count'):
+            raise forms.ValidationError("Вкажіть або місця, або їх кількість, але не обидва")
+        return cleaned_data
 
 
 class FuelPriceForm(forms.ModelForm):
@@ -39,4 +74,80 @@ class FuelPriceForm(forms.ModelForm):
         }
         labels = {
             'price': 'Ціна пального (грн/л)',
-        }
\ No newline at end of file
+        }
+
+
+class ReportPeriodForm(forms.Form):
+    """Період та пункт прибуття для звітів"""
+    MAX_SPAN_DAYS = 366
+
+    date_from = forms.DateField(
+        label='З', required=False,
+        widget=forms.DateInput(format='%Y-%m-%d', attrs={'type': 'date', 'class': 'form-control form-control-sm'})
+    )
+    date_to = forms.DateField(
+        label='По', required=False,
+        widget=forms.DateInput(format='%Y-%m-%d', attrs={'type': 'date', 'class': 'form-control form-control-sm'})
+    )
+    destination = forms.ModelChoiceField(
+        label='Пункт прибуття', required=False,
+        queryset=Destination.objects.order_by('name'),
+        empty_label='Всі пункти',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+
+    def __init__(self, *args, default_days=30, default_days_ahead=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_days = default_days
+        self.default_days_ahead = default_days_ahead
+        date_from, date_to = self.default_period()
+        self.fields['date_from'].initial = date_from
+        self.fields['date_to'].initial = date_to
+
+    def default_period(self):
+        date_to = timezone.now().date() + timedelta(days=self.default_days_ahead)
+        return date_to - timedelta(days=self.default_days + self.default_days_ahead), date_to
+
+    def clean(self):
+        cleaned_data = super().clean()
+        default_from, default_to = self.default_period()
+        date_to = cleaned_data.get('date_to') or default_to
+        date_from = cleaned_data.get('date_from') or date_to - (default_to - default_from)
+
+        if date_from > date_to:
+            raise forms.ValidationError("Початкова дата не може бути пізнішою за кінцеву")
+        if (date_to - date_from).days > self.MAX_SPAN_DAYS:
+            raise forms.ValidationError(f"Період звіту не може перевищувати {self.MAX_SPAN_DAYS} днів")
+
+        cleaned_data['date_from'] = date_from
+        cleaned_data['date_to'] = date_to
+        return cleaned_data
+
+    def get_period(self):
+        """
+        (з, по, пункт прибуття) для запиту
+        Для порожньої або невалідної форми - період за замовчуванням
+        """
+        if self.is_bound and self.is_valid():
+            return self.cleaned_data['date_from'], self.cleaned_data['date_to'], self.cleaned_data['destination']
+        date_from, date_to = self.default_period()
+        return date_from, date_to, None
+
+
+class TripSearchForm(forms.Form):
+    """Параметри пошуку рейсів для JSON API"""
+    date = forms.DateField(required=False)
+    destination = forms.IntegerField(required=False, min_value=1)
+    departure_from = forms.TimeField(required=False)
+    departure_to = forms.TimeField(required=False)
+
+    def clean_date(self):
+        return self.cleaned_data['date'] or timezone.now().date()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        departure_from = cleaned_data.get('departure_from')
+        departure_to = cleaned_data.get('departure_to')
+        if departure_from and departure_to and departure_from > departure_to:
+            raise forms.ValidationError("Початок вікна відправлення пізніший за його кінець")
+        return cleaned_data
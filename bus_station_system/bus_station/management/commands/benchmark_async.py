@@ -0,0 +1,124 @@
+# bus_station/management/commands/benchmark_async.py
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.test import AsyncClient, override_settings
+from django.urls import include, path
+from django.utils import timezone
+from django.views.decorators.http import condition
+from django.views.generic import ListView
+from bus_station.models import Trip
+from bus_station.utils import get_seat_map_state, get_station_stats, seat_map_free_seats
+from bus_station.views import TripListView
+
+
+# ===== СИНХРОННА РЕАЛІЗАЦІЯ ДЛЯ ПОРІВНЯННЯ =====
+# Ті самі сторінки у вигляді sync-views, якими вони були до переходу на async
+
+def _sync_seat_map_etag(request, trip_id):
+    state = get_seat_map_state(trip_id)
+    return f'"{trip_id}-{state["version"]}"' if state else None
+
+
+@condition(etag_func=_sync_seat_map_etag)
+def sync_available_seats(request, trip_id):
+    state = get_seat_map_state(trip_id)
+    if state is None:
+        raise Http404("Рейс не знайдено")
+    return JsonResponse({
+        'available_seats': seat_map_free_seats(state),
+        'total_seats': state['seats_count']
+    })
+
+
+class SyncTripListView(TripListView):
+    get = ListView.get
+
+
+def sync_home(request):
+    today = timezone.now().date()
+    stats = get_station_stats(today)
+    return render(request, 'bus_station/home.html', {
+        'today_trips': stats['trips'],
+        'today_tickets': stats['tickets'],
+        'today_date': today
+    })
+
+
+# URLconf синхронного варіанту: решта маршрутів (і їхні імена) - з проєкту
+urlpatterns = [
+    path('', sync_home),
+    path('trips/', SyncTripListView.as_view()),
+    path('tickets/get-available-seats/<int:trip_id>/', sync_available_seats),
+    path('', include('bus_station_system.urls')),
+]
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Пропускна здатність async-views проти синхронних під ASGI при багатьох одночасних з\'єднаннях'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Кількість запитів на кожну сторінку')
+        parser.add_argument('--concurrency', type=int, default=100, help='Кількість одночасних з\'єднань')
+        parser.add_argument('--trip', type=int, help='ID рейсу для карти місць (за замовчуванням - останній)')
+
+    def handle(self, *args, **options):
+        trip_id = options['trip'] or Trip.objects.order_by('-pk').values_list('pk', flat=True).first()
+        if trip_id is None:
+            raise CommandError("Немає жодного рейсу")
+
+        pages = [
+            ('seats', f'/tickets/get-available-seats/{trip_id}/'),
+            ('trips', '/trips/'),
+            ('home', '/'),
+        ]
+        self.stdout.write(
+            f"{options['requests']} запитів на сторінку, {options['concurrency']} одночасних з'єднань"
+        )
+
+        for name, url in pages:
+            with override_settings(ROOT_URLCONF=__name__):
+                sync_result = asyncio.run(self.run_page(url, options))
+            async_result = asyncio.run(self.run_page(url, options))
+
+            for stack, (rate, p50, p95, errors) in (('sync', sync_result), ('async', async_result)):
+                style = self.style.ERROR if errors else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{name:6} {stack:6} {rate:8.0f} запитів/с, p50 {p50 * 1000:6.1f} мс, "
+                    f"p95 {p95 * 1000:6.1f} мс, помилок {errors}"
+                ))
+            self.stdout.write(f"{name:6} async/sync: {async_result[0] / sync_result[0]:.2f}x")
+
+    async def run_page(self, url, options):
+        """(запитів/с, p50, p95, помилок) для однієї сторінки через ASGI-обробник Django"""
+        client = AsyncClient()
+        # Прогрів: кеші карт місць, статистики та шаблонів
+        for _ in range(3):
+            await client.get(url)
+
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+        errors = 0
+
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return len(latencies) / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.95), errors
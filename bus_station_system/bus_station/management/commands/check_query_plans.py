@@ -0,0 +1,112 @@
+# bus_station/management/commands/check_query_plans.py
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.utils import timezone
+from datetime import timedelta
+from bus_station.models import ReportDailyFact, Ticket, Trip
+from bus_station.utils import STATION_STATS_AGGREGATES
+
+# Повне сканування таблиці в плані PostgreSQL та SQLite
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+
+
+def hot_queries():
+    """Гарячі запити з views, utils та context processor"""
+    today = timezone.now().date()
+    now = timezone.now()
+    trip = Trip.objects.order_by('-date').first()
+    trip_id, route_id = (trip.pk, trip.route_id) if trip else (0, 0)
+
+    tickets = Ticket.objects.select_related('trip__route__destination', 'trip__bus__bus_model')
+    trips = Trip.objects.select_related('route__destination', 'bus__bus_model')
+
+    return [
+        ('ticket_list', tickets.order_by('-booking_time', '-id')[:20]),
+        ('ticket_list?status', tickets.filter(status='booked').order_by('-booking_time', '-id')[:20]),
+        ('ticket_list?trip_date', tickets.filter(trip__date=today).order_by('-booking_time', '-id')[:20]),
+        ('trip_list', trips.filter(date__gte=today).order_by('date', 'route__departure_time', 'id')[:20]),
+        ('trip_list?date', trips.filter(date=today).order_by('route__departure_time', 'id')[:20]),
+        ('trip_detail.tickets', Ticket.objects.filter(trip_id=trip_id)),
+        ('seat_map', Trip.objects.filter(pk=trip_id).values_list('seat_map', 'bus__bus_model__seats_count')),
+        ('rebuild_seat_map.tickets', Ticket.objects.filter(
+            trip_id=trip_id
+        ).exclude(status='cancelled').values_list('seat_number', flat=True)),
+        ('cancel_expired_bookings', Ticket.objects.filter(
+            status='booked',
+            booking_time__lte=now - Ticket.BOOKING_TTL
+        ).order_by('pk')[:1000]),
+        # aggregate() не має explain(), тому той самий запит з групуванням за днем
+        ('station_stats', Trip.objects.filter(date=today).values('date').annotate(**STATION_STATS_AGGREGATES)),
+        ('revenue_for_period', Ticket.objects.filter(
+            status='sold',
+            sold_time__gte=now - timedelta(days=30),
+            sold_time__lt=now
+        ).values('price')),
+        ('reports.facts', ReportDailyFact.objects.filter(
+            date__range=(today - timedelta(days=30), today)
+        ).values('route_id').annotate(trip_count=Sum('trips'))),
+        ('reports.rebuild_facts', Trip.objects.filter(
+            date=today, route_id__in=[route_id]
+        ).values('date', 'route_id').annotate(trip_count=Count('id')).order_by()),
+        ('reports.revenue_by_destination', Ticket.objects.filter(
+            status='sold',
+            sold_time__gte=now - timedelta(days=30),
+            sold_time__lt=now
+        ).values('trip__route__destination__name').annotate(total_revenue=Sum('price'))),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN гарячих запитів; помилка, якщо якийсь повністю сканує велику таблицю'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help='Повне сканування меншої таблиці не вважається помилкою')
+        parser.add_argument('--show-plans', action='store_true', help='Вивести повні плани')
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Аналіз планів для {connection.vendor} не підтримується")
+
+        # Перевіряємо лише таблиці, що ростуть з часом
+        table_rows = {
+            Trip._meta.db_table: Trip.objects.count(),
+            Ticket._meta.db_table: Ticket.objects.count(),
+            ReportDailyFact._meta.db_table: ReportDailyFact.objects.count(),
+        }
+        self.stdout.write(
+            "Розмір таблиць: " + ", ".join(f"{table}={rows}" for table, rows in table_rows.items())
+        )
+
+        failures = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            scanned = [
+                table for table in pattern.findall(plan)
+                if table in table_rows
+            ]
+            large = [table for table in scanned if table_rows[table] >= options['min_rows']]
+
+            if large:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: повне сканування {', '.join(large)}"))
+            elif scanned:
+                self.stdout.write(self.style.WARNING(
+                    f"{name}: повне сканування малої таблиці {', '.join(scanned)}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: OK"))
+
+            if options['show_plans'] or large:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"Запити з повним скануванням: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Усі гарячі запити використовують індекси"))
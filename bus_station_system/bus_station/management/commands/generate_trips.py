@@ -1,65 +1,126 @@
 # bus_station/management/commands/generate_trips.py
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 from bus_station.models import Route, Trip, Bus
+from bus_station.reports import refresh_report_facts
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
-    help = 'Автоматичне формування рейсів на наступний день'
+    help = 'Автоматичне формування рейсів на наступний день (або на кілька днів наперед)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from',
+                            help='Перша дата розкладу, РРРР-ММ-ДД (за замовчуванням - завтра)')
+        parser.add_argument('--days', type=int, default=1, help='Кількість днів розкладу')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Кількість рейсів в одному INSERT')
 
     def handle(self, *args, **options):
-        tomorrow = timezone.now().date() + timedelta(days=1)
-        tomorrow_weekday = tomorrow.isoweekday()  # 1-Понеділок, 7-Неділя
-
-        self.stdout.write(f"Формування рейсів на {tomorrow.strftime('%d.%m.%Y')}...")
-
-        # Знаходимо маршрути, які мають виходити завтра
-        routes_to_generate = []
-        for route in Route.objects.all():
-            route_days = [int(day.strip()) for day in route.days_of_week.split(',')]
-            if tomorrow_weekday in route_days:
-                routes_to_generate.append(route)
-
-        created_count = 0
-        for route in routes_to_generate:
-            # Перевіряємо, чи такий рейс вже існує
-            if not Trip.objects.filter(route=route, date=tomorrow).exists():
-                # Знаходимо доступний автобус відповідної марки
-                available_bus = Bus.objects.filter(bus_model=route.bus_model).first()
-
-                if available_bus:
-                    try:
-                        Trip.objects.create(
-                            route=route,
-                            bus=available_bus,
-                            date=tomorrow
-                        )
-                        created_count += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"Створено рейс: {route.number} - {tomorrow.strftime('%d.%m.%Y')}"
-                            )
-                        )
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"Помилка при створенні рейсу {route.number}: {e}"
-                            )
-                        )
-                else:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"Немає доступного автобуса марки {route.bus_model} для рейсу {route.number}"
-                        )
+        if options['date_from']:
+            try:
+                start_date = date.fromisoformat(options['date_from'])
+            except ValueError:
+                raise CommandError(f"Невірна дата: {options['date_from']}")
+        else:
+            start_date = timezone.now().date() + timedelta(days=1)
+
+        if options['days'] < 1:
+            raise CommandError("Кількість днів має бути додатною")
+
+        dates = [start_date + timedelta(days=offset) for offset in range(options['days'])]
+        end_date = dates[-1]
+
+        self.stdout.write(
+            f"Формування рейсів на {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}..."
+        )
+
+        # Перший автобус кожної марки - одним запитом
+        buses_by_model = {}
+        for bus_model_id, bus_id in Bus.objects.order_by('pk').values_list('bus_model_id', 'pk'):
+            buses_by_model.setdefault(bus_model_id, bus_id)
+
+        # Рейси, які вже існують у цьому періоді
+        existing_trips = set(
+            Trip.objects.filter(
+                date__range=(start_date, end_date)
+            ).values_list('route_id', 'date')
+        )
+
+        new_trips = []
+        routes = Route.objects.select_related('bus_model').only(
+            'pk', 'number', 'days_mask', 'bus_model__name', 'bus_model__seats_count'
+        ).filter(days_mask__gt=0)
+        for route in routes:
+            route_dates = [
+                trip_date for trip_date in dates
+                if route.runs_on(trip_date.isoweekday())
+                and (route.pk, trip_date) not in existing_trips
+            ]
+            if not route_dates:
+                continue
+
+            # Знаходимо доступний автобус відповідної марки
+            bus_id = buses_by_model.get(route.bus_model_id)
+            if bus_id is None:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Немає доступного автобуса марки {route.bus_model} для рейсу {route.number}"
                     )
+                )
+                continue
+
+            for trip_date in route_dates:
+                new_trips.append(Trip(route_id=route.pk, bus_id=bus_id, date=trip_date))
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f"Рейс: {route.number} - {trip_date.strftime('%d.%m.%Y')}")
+
+        created_count = sum(
+            self.insert_trips(new_trips[start:start + options['batch_size']])
+            for start in range(0, len(new_trips), options['batch_size'])
+        )
+        skipped_count = len(new_trips) - created_count
+        if skipped_count > 0:
+            self.stdout.write(
+                self.style.WARNING(f"Пропущено {skipped_count} рейсів, створених паралельно")
+            )
+        if created_count:
+            refresh_report_facts(since=start_date, until=end_date)
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Успішно створено {created_count} рейсів на {tomorrow.strftime('%d.%m.%Y')}"
+                f"Успішно створено {created_count} рейсів на "
+                f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
             )
         )
-        logger.info(f"Generated {created_count} trips for {tomorrow}")
\ No newline at end of file
+        logger.info(f"Generated {created_count} trips for {start_date}..{end_date}")
+
+    def insert_trips(self, trips):
+        """
+        Вставити пачку рейсів, повертає кількість справді вставлених
+        Рейси, створені паралельно після читання існуючих, порушують
+        unique_together(route, date): тоді пачка відкочується до точки збереження,
+        такі рейси відкидаються і решта вставляється знову. Тому враховуються
+        лише рейси, вставлені саме цим запуском.
+        """
+        while trips:
+            try:
+                with transaction.atomic():
+                    Trip.objects.bulk_create(trips)
+                return len(trips)
+            except IntegrityError:
+                taken = set(
+                    Trip.objects.filter(
+                        date__in={trip.date for trip in trips},
+                        route_id__in={trip.route_id for trip in trips}
+                    ).values_list('route_id', 'date')
+                )
+                remaining = [trip for trip in trips if (trip.route_id, trip.date) not in taken]
+                if len(remaining) == len(trips):
+                    raise
+                trips = remaining
+        return 0
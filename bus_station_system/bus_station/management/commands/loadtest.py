@@ -0,0 +1,396 @@
+# bus_station/management/commands/loadtest.py
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+import json
+import multiprocessing
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+from bus_station.models import Ticket, Trip
+
+# Дії клієнта і їхні ваги за замовчуванням
+DEFAULT_MIX = 'book=1,poll=4,list=1'
+ACTIONS = ('book', 'poll', 'list', 'trips')
+
+CSRF_TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+TICKET_URL_RE = re.compile(r'/tickets/(\d+)/$')
+
+SERVER_CLOCK_SKEW = timedelta(minutes=1)
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Редиректи не виконуються: кожна сторінка вимірюється окремо"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class LoadClient:
+    """Один користувач сайту зі своїми cookies (сесія, CSRF) та статистикою запитів"""
+
+    def __init__(self, base_url, urls, trip_ids, polls, rng):
+        self.base_url = base_url
+        self.urls = urls
+        self.trip_ids = trip_ids
+        self.polls = polls
+        self.rng = rng
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect)
+        self.csrf_token = None
+        self.etags = {}
+        self.seats = {}
+        # назва URL -> {'latencies': [...], 'errors': Counter, 'conflicts': n}
+        self.stats = {}
+        self.bookings = 0
+        # id квитків, створених цим клієнтом (з Location редиректу після бронювання)
+        self.ticket_ids = []
+
+    def request(self, name, url, data=None, headers=None):
+        """(статус, заголовки, тіло, статистика URL) з записом затримки; None при мережевій помилці"""
+        method = 'POST' if data is not None else 'GET'
+        stats = self.stats.setdefault(f'{method} {name}', {'latencies': [], 'errors': Counter(), 'conflicts': 0})
+        request = urllib.request.Request(
+            self.base_url + url,
+            data=urlencode(data).encode() if data is not None else None,
+            headers=headers or {}
+        )
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                status, response_headers, body = response.status, response.headers, response.read()
+        except HTTPError as e:
+            # 302 і 304 - теж відповіді (редиректи вимкнено)
+            status, response_headers, body = e.code, e.headers, e.read()
+        except (URLError, OSError) as e:
+            stats['latencies'].append(time.perf_counter() - started)
+            stats['errors'][type(e).__name__] += 1
+            return None
+        stats['latencies'].append(time.perf_counter() - started)
+        if status >= 400:
+            stats['errors'][f'HTTP {status}'] += 1
+        return status, response_headers, body, stats
+
+    def load_csrf_token(self):
+        """Сторінка бронювання: cookie сесії CSRF і токен форми"""
+        result = self.request('ticket_create', self.urls['ticket_create'])
+        if result and result[0] == 200:
+            match = CSRF_TOKEN_RE.search(result[2].decode())
+            if match:
+                self.csrf_token = match.group(1)
+        return self.csrf_token is not None
+
+    def poll_seats(self, trip_id):
+        """Вільні місця рейсу; з If-None-Match, як при опитуванні зі сторінки"""
+        headers = {'If-None-Match': self.etags[trip_id]} if trip_id in self.etags else {}
+        result = self.request(
+            'get_available_seats', self.urls['get_available_seats'].format(trip_id=trip_id), headers=headers
+        )
+        if result is None or result[0] not in (200, 304):
+            return None
+        status, response_headers, body, stats = result
+        if status == 200:
+            self.etags[trip_id] = response_headers.get('ETag')
+            self.seats[trip_id] = json.loads(body)['available_seats']
+        return self.seats.get(trip_id)
+
+    def action_poll(self):
+        self.poll_seats(self.rng.choice(self.trip_ids))
+
+    def action_list(self):
+        self.request('ticket_list', self.urls['ticket_list'])
+
+    def action_trips(self):
+        self.request('trip_list', self.urls['trip_list'])
+
+    def action_book(self):
+        """Повний шлях покупки: опитування місць -> бронювання -> підтвердження -> список квитків"""
+        if self.csrf_token is None and not self.load_csrf_token():
+            return
+
+        trip_id = self.rng.choice(self.trip_ids)
+        free_seats = None
+        for _ in range(self.polls):
+            free_seats = self.poll_seats(trip_id)
+        if not free_seats:
+            return
+
+        result = self.request('ticket_create', self.urls['ticket_create'], data={
+            'csrfmiddlewaretoken': self.csrf_token,
+            'trip': trip_id,
+            'seat_number': self.rng.choice(free_seats),
+        }, headers={'Referer': self.base_url + self.urls['ticket_create']})
+        if result is None:
+            return
+        status, response_headers, body, stats = result
+        match = TICKET_URL_RE.search(response_headers.get('Location') or '') if status == 302 else None
+        if match is None:
+            if status == 200:
+                # Форму показано знову: місце встигли зайняти інші
+                stats['conflicts'] += 1
+            elif status < 400:
+                stats['errors'][f'HTTP {status}'] += 1
+            return
+        self.ticket_ids.append(int(match.group(1)))
+
+        result = self.request(
+            'confirm_booking', self.urls['confirm_booking'].format(ticket_id=match.group(1)),
+            data={'csrfmiddlewaretoken': self.csrf_token}
+        )
+        if result is None:
+            return
+        if result[0] == 302:
+            self.bookings += 1
+        elif result[0] < 400:
+            result[3]['errors'][f'HTTP {result[0]}'] += 1
+
+        self.action_list()
+
+    def run(self, mix, duration):
+        actions = list(mix)
+        weights = [mix[action] for action in actions]
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            getattr(self, f'action_{self.rng.choices(actions, weights)[0]}')()
+        return {'stats': self.stats, 'bookings': self.bookings, 'ticket_ids': self.ticket_ids}
+
+
+def run_client(base_url, urls, trip_ids, mix, duration, polls, seed):
+    """Процес-клієнт: один LoadClient протягом duration секунд"""
+    return LoadClient(base_url, urls, trip_ids, polls, random.Random(seed)).run(mix, duration)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def parse_mix(value):
+    """'book=1,poll=4' -> {'book': 1.0, 'poll': 4.0}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ACTIONS:
+            raise CommandError(f"Невідома дія '{name}'; доступні: {', '.join(ACTIONS)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Некоректна вага дії '{name}': {weight}")
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        raise CommandError("Суміш запитів порожня")
+    return mix
+
+
+class Command(BaseCommand):
+    help = ('Наскрізне HTTP-навантаження на шлях бронювання з кількох процесів-клієнтів; '
+            'затримки й помилки за назвами URL і перевірка подвійного продажу місць')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help='Кількість процесів-клієнтів')
+        parser.add_argument('--duration', type=float, default=30, help='Тривалість навантаження, с')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f"Ваги дій клієнта через кому ({', '.join(ACTIONS)}), "
+                                 f"за замовчуванням {DEFAULT_MIX}")
+        parser.add_argument('--trips', type=int, default=5,
+                            help='Скільки майбутніх рейсів з вільними місцями бронювати')
+        parser.add_argument('--polls', type=int, default=2,
+                            help='Скільки разів опитати вільні місця перед бронюванням')
+        parser.add_argument('--port', type=int, default=8765, help='Порт локального сервера')
+        parser.add_argument('--url', help='Адреса вже запущеного сервера замість локального runserver; '
+                                          'сервер має працювати з тією самою базою даних')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true',
+                            help='Не видаляти квитки, створені клієнтами навантаження')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        trip_ids = list(Trip.objects.filter(
+            date__gt=timezone.now().date(),
+            free_seats__gt=0
+        ).order_by('-free_seats', 'pk').values_list('pk', flat=True)[:options['trips']])
+        if not trip_ids:
+            raise CommandError("Немає майбутніх рейсів з вільними місцями")
+
+        urls = {
+            'ticket_create': reverse('ticket_create'),
+            'ticket_list': reverse('ticket_list'),
+            'trip_list': reverse('trip_list'),
+            'confirm_booking': reverse('confirm_booking', args=[0]).replace('/0/', '/{ticket_id}/'),
+            'get_available_seats': reverse('get_available_seats', args=[0]).replace('/0/', '/{trip_id}/'),
+        }
+
+        # Час бронювання ставить сервер: допускаємо розбіжність його годинника
+        self.started_at = timezone.now() - SERVER_CLOCK_SKEW
+        ticket_ids = []
+        server = None
+        base_url = (options['url'] or '').rstrip('/')
+        if base_url:
+            ticket_ids.append(self.check_same_database(base_url, urls, trip_ids))
+        else:
+            server = self.start_server(options)
+            base_url = f"http://127.0.0.1:{options['port']}"
+
+        self.stdout.write(
+            f"{options['clients']} клієнтів, {options['duration']:g} с, суміш {options['mix']}, "
+            f"рейси {', '.join(map(str, trip_ids))}, сервер {base_url}"
+        )
+
+        # Процеси-клієнти працюють лише через HTTP і не відкривають з'єднань з базою
+        connections.close_all()
+        rng = random.Random(options['seed'])
+        try:
+            started = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=options['clients'],
+                                     mp_context=multiprocessing.get_context('fork')) as executor:
+                futures = [
+                    executor.submit(run_client, base_url, urls, trip_ids, mix, options['duration'],
+                                    options['polls'], rng.random())
+                    for _ in range(options['clients'])
+                ]
+                results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - started
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+        errors = self.report(results, elapsed)
+        ticket_ids += [ticket_id for result in results for ticket_id in result['ticket_ids']]
+        created_tickets = Ticket.objects.filter(
+            pk__in=ticket_ids, trip_id__in=trip_ids, booking_time__gte=self.started_at
+        )
+        problems = self.check_trips(trip_ids)
+        found = created_tickets.count()
+        if found != len(ticket_ids):
+            # Частини квитків у цій базі немає: нічого не видаляємо, щоб не зачепити чужі
+            problems.append(f"З {len(ticket_ids)} створених клієнтами квитків у базі знайдено {found}")
+        elif not options['keep']:
+            # Лише квитки клієнтів навантаження: справжні бронювання за час прогону лишаються
+            created_tickets.delete()
+
+        if problems:
+            raise CommandError('; '.join(problems))
+        if errors:
+            self.stdout.write(self.style.WARNING(f"Помилок запитів: {errors}"))
+        self.stdout.write(self.style.SUCCESS("Подвійного продажу місць не виявлено"))
+
+    def start_server(self, options):
+        """Локальний runserver з тими самими налаштуваннями і базою; чекає, доки порт прийме з'єднання"""
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver',
+            f"127.0.0.1:{options['port']}", '--noreload', '--skip-checks',
+        ]
+        output = None if options['verbosity'] >= 2 else subprocess.DEVNULL
+        server = subprocess.Popen(command, env=os.environ.copy(), stdout=output, stderr=output)
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Сервер завершився з кодом {server.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', options['port']), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"Сервер не запустився на порту {options['port']}")
+
+    def check_same_database(self, base_url, urls, trip_ids, attempts=5):
+        """
+        Пробне бронювання через зовнішній сервер; його квиток має з'явитися в цій базі
+        Інакше сервер працює з іншою базою (або її копією), і перевірка та
+        прибирання квитків торкнулися б не тих даних. Повертає id пробного квитка
+        """
+        client = LoadClient(base_url, urls, trip_ids, 1, random.Random())
+        for _ in range(attempts):
+            client.action_book()
+            if client.ticket_ids:
+                break
+        else:
+            raise CommandError(f"Не вдалося забронювати пробний квиток через {base_url}")
+
+        ticket_id = client.ticket_ids[0]
+        probe = Ticket.objects.filter(pk=ticket_id, trip_id__in=trip_ids, booking_time__gte=self.started_at)
+        if not probe.exists():
+            raise CommandError(
+                f"Сервер {base_url} працює з іншою базою даних: пробного квитка {ticket_id} у цій базі немає; "
+                f"запустіть команду з налаштуваннями бази цього сервера"
+            )
+        return ticket_id
+
+    def report(self, results, elapsed):
+        """Таблиця затримок і помилок за назвами URL; повертає загальну кількість помилок"""
+        merged = {}
+        for result in results:
+            for name, stats in result['stats'].items():
+                total = merged.setdefault(name, {'latencies': [], 'errors': Counter(), 'conflicts': 0})
+                total['latencies'].extend(stats['latencies'])
+                total['errors'].update(stats['errors'])
+                total['conflicts'] += stats['conflicts']
+
+        total_errors = 0
+        for name, stats in sorted(merged.items()):
+            latencies = sorted(stats['latencies'])
+            errors = sum(stats['errors'].values())
+            total_errors += errors
+            style = self.style.ERROR if errors else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{name:28} {len(latencies):7} запитів {len(latencies) / elapsed:8.1f}/с  "
+                f"p50 {percentile(latencies, 0.5) * 1000:7.1f}  "
+                f"p95 {percentile(latencies, 0.95) * 1000:7.1f}  "
+                f"p99 {percentile(latencies, 0.99) * 1000:7.1f} мс  "
+                f"помилок {errors / len(latencies):6.2%}  конфліктів {stats['conflicts']}"
+            ))
+            for error, count in stats['errors'].most_common():
+                self.stdout.write(self.style.WARNING(f"  {count} x {error}"))
+
+        bookings = sum(result['bookings'] for result in results)
+        self.stdout.write(f"Продано квитків: {bookings}, {bookings / elapsed:.1f} покупок/с")
+        return total_errors
+
+    def check_trips(self, trip_ids):
+        """Подвійний продаж місць, лічильники і карти місць рейсів після навантаження"""
+        problems = []
+        active = Ticket.objects.filter(trip_id__in=trip_ids).exclude(status='cancelled')
+
+        duplicates = list(active.values('trip_id', 'seat_number').annotate(
+            tickets=Count('id')
+        ).filter(tickets__gt=1))
+        if duplicates:
+            problems.append(f"Подвійний продаж місць: {duplicates}")
+
+        counts = {
+            row['trip_id']: row for row in active.values('trip_id').annotate(
+                sold=Count('id', filter=Q(status='sold')),
+                booked=Count('id', filter=Q(status='booked')),
+            )
+        }
+        for trip in Trip.objects.filter(pk__in=trip_ids):
+            row = counts.get(trip.pk, {'sold': 0, 'booked': 0})
+            occupied = int.from_bytes(trip.seat_map or b'', 'little').bit_count()
+            if (trip.sold_count, trip.booked_count) != (row['sold'], row['booked']):
+                problems.append(
+                    f"Рейс {trip.pk}: лічильники {trip.sold_count}/{trip.booked_count}, "
+                    f"за квитками {row['sold']}/{row['booked']}"
+                )
+            if occupied != row['sold'] + row['booked']:
+                problems.append(
+                    f"Рейс {trip.pk}: у карті місць {occupied} зайнятих, "
+                    f"за квитками {row['sold'] + row['booked']}"
+                )
+        return problems
@@ -0,0 +1,45 @@
+# bus_station/management/commands/recount_trip_counters.py
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+from bus_station.models import Trip
+from bus_station.reports import refresh_report_facts, refresh_trip_facts
+from bus_station.utils import forget_future_seat_maps, rebuild_seat_maps, recount_trip_counters
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Перерахунок лічильників місць, карт місць рейсів та підсумків звітів за квитками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trip', type=int, action='append', dest='trip_ids',
+                            help='ID рейсу (можна вказати кілька разів)')
+        parser.add_argument('--since', help='Лише рейси з датою не раніше (РРРР-ММ-ДД)')
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+        except ValueError:
+            raise CommandError(f"Невірна дата: {options['since']}")
+
+        trips = Trip.objects.all()
+        if options['trip_ids']:
+            trips = trips.filter(pk__in=options['trip_ids'])
+        if since:
+            trips = trips.filter(date__gte=since)
+
+        self.stdout.write("Перерахунок лічильників рейсів...")
+        updated_count = recount_trip_counters(trips)
+        # Карти записуються лише в базу; з кешу прибираються тільки майбутні рейси
+        rebuild_seat_maps(trips, publish=False)
+        forget_future_seat_maps(trips)
+        if options['trip_ids']:
+            refresh_trip_facts(options['trip_ids'])
+        else:
+            refresh_report_facts(since=since)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Оновлено лічильники та карти місць {updated_count} рейсів")
+        )
+        logger.info(f"Recounted counters for {updated_count} trips")
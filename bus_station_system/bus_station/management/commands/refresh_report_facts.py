@@ -0,0 +1,28 @@
+# bus_station/management/commands/refresh_report_facts.py
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+from bus_station.reports import refresh_report_facts
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Перебудова денних підсумків рейсів для звітів'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Перша дата, РРРР-ММ-ДД (за замовчуванням - уся історія)')
+        parser.add_argument('--until', help='Остання дата, РРРР-ММ-ДД')
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+            until = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(f"Невірна дата: {e}")
+
+        self.stdout.write("Перебудова підсумків для звітів...")
+        facts_count = refresh_report_facts(since=since, until=until)
+
+        self.stdout.write(self.style.SUCCESS(f"Записано {facts_count} денних підсумків"))
+        logger.info(f"Rebuilt {facts_count} report facts since {since or 'beginning'}")
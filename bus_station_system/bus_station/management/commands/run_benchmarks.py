@@ -0,0 +1,241 @@
+# bus_station/management/commands/run_benchmarks.py
+from datetime import datetime
+from pathlib import Path
+import io
+import json
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from bus_station import views
+from bus_station.models import Trip
+from bus_station.utils import (calculate_final_ticket_price, get_available_seats, get_trip_occupancy_percentage,
+                               validate_seat_number)
+
+# Масштаб seed_synthetic для кожного розміру даних (приблизно 10 тис., 50 тис. і 250 тис. квитків)
+DATA_SIZES = {
+    'small': 0.01,
+    'medium': 0.05,
+    'large': 0.25,
+}
+
+REPORT_VIEWS = [
+    'reports_dashboard',
+    'report_most_popular_destinations',
+    'report_trip_dates_coordination',
+    'report_average_bus_occupancy',
+    'report_busiest_days',
+    'report_rarest_trips',
+    'report_revenue_by_destination',
+]
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmark_baseline.json'
+
+# Погіршення, менші за ці пороги, вважаються шумом вимірювання
+TIME_NOISE_SECONDS = 0.00001
+MEMORY_NOISE_KB = 64
+
+
+def function_benchmarks(trip):
+    """(назва, виклик) функцій ціни та місць для рейсу з найбільшою кількістю квитків"""
+    seat_number = (get_available_seats(trip) or [1])[0]
+    return [
+        ('calculate_final_ticket_price', lambda: calculate_final_ticket_price(trip)),
+        ('Trip.calculate_ticket_price', lambda: trip.calculate_ticket_price()),
+        ('get_available_seats', lambda: get_available_seats(trip)),
+        ('validate_seat_number', lambda: validate_seat_number(trip, seat_number)),
+        ('get_trip_occupancy_percentage', lambda: get_trip_occupancy_percentage(trip)),
+    ]
+
+
+def report_benchmarks():
+    """(назва, виклик) views звітів; вимірюються з setup=cache.clear, щоб звіт справді рахувався"""
+    factory = RequestFactory()
+
+    def call_view(name):
+        request = factory.get('/')
+        request.user = AnonymousUser()
+        response = getattr(views, name)(request)
+        if response.status_code != 200:
+            raise CommandError(f"{name}: статус {response.status_code}")
+
+    return [(f'view.{name}', lambda name=name: call_view(name)) for name in REPORT_VIEWS]
+
+
+def measure(func, repeat, iterations, setup=None):
+    """
+    Медіанний час одного виклику (с), кількість запитів і пік пам'яті (КБ)
+    setup викликається перед кожним викликом func і в результати не входить
+    """
+    if setup:
+        setup()
+    func()  # прогрів
+
+    if setup:
+        setup()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        if setup is None:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            timings.append((time.perf_counter() - started) / iterations)
+            continue
+        # З setup час кожного виклику вимірюється окремо
+        elapsed = 0
+        for _ in range(iterations):
+            setup()
+            started = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - started
+        timings.append(elapsed / iterations)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'time': statistics.median(timings),
+        'queries': len(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Мікробенчмарки ціни, місць і звітів на тимчасовій базі різного розміру; '
+            'помилка, якщо результат гірший за збережений базовий')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(DATA_SIZES),
+                            help=f"Розміри даних через кому ({', '.join(DATA_SIZES)})")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='JSON-файл базових результатів')
+        parser.add_argument('--save', action='store_true', help='Записати результати як нові базові')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Допустиме погіршення часу та пам\'яті (0.25 = 25%%)')
+        parser.add_argument('--repeat', type=int, default=5, help='Кількість вимірів часу (береться медіана)')
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Викликів функції в одному вимірі (для звітів - 1)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = [size for size in sizes if size not in DATA_SIZES]
+        if unknown:
+            raise CommandError(f"Невідомі розміри даних: {', '.join(unknown)}")
+        sizes.sort(key=DATA_SIZES.get)
+
+        baseline_path = Path(options['baseline'])
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        if not options['save']:
+            # Без базових результатів тієї ж бази даних порівнювати нема з чим
+            if not baseline:
+                raise CommandError(
+                    f"Немає базових результатів {baseline_path}; запишіть їх з --save"
+                )
+            if baseline.get('database') != connection.vendor:
+                raise CommandError(
+                    f"Базові результати записано на {baseline.get('database')}, а поточна база - "
+                    f"{connection.vendor}; запишіть нові з --save або вкажіть інший --baseline"
+                )
+            missing = [size for size in sizes if size not in baseline.get('results', {})]
+            if missing:
+                raise CommandError(
+                    f"Немає базових результатів для розмірів {', '.join(missing)}; запишіть їх з --save"
+                )
+        # Результати іншої бази даних не порівнюються і не змішуються з поточними
+        previous = baseline.get('results', {}) if baseline.get('database') == connection.vendor else {}
+
+        # Тимчасова тестова база: робоча база не змінюється
+        old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=[])
+        try:
+            results = self.run_sizes(sizes, options)
+        finally:
+            # Поки тестова база ще підключена: кеш у базі даних - це її таблиця,
+            # після teardown cache.clear() очистив би кеш робочої бази
+            cache.clear()
+            teardown_databases(old_config, verbosity=0)
+
+        regressions = self.compare(results, previous, options['threshold'])
+
+        if options['save']:
+            merged = {**previous, **results}
+            baseline_path.write_text(json.dumps({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'results': merged,
+            }, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(f"Базові результати записано в {baseline_path}")
+        elif regressions:
+            raise CommandError(f"Погіршення: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("Бенчмарки завершено"))
+
+    def run_sizes(self, sizes, options):
+        """Наповнює базу до кожного розміру по черзі і вимірює всі бенчмарки"""
+        results = {}
+        scale = 0
+        for index, size in enumerate(sizes):
+            self.stdout.write(f"Дані '{size}'...")
+            # Кожен наступний розмір - дозаповнення попереднього
+            call_command(
+                'seed_synthetic', scale=DATA_SIZES[size] - scale, seed=options['seed'] + index,
+                stdout=io.StringIO()
+            )
+            scale = DATA_SIZES[size]
+            cache.clear()
+
+            trip = Trip.objects.select_related(
+                'route__bus_model', 'bus__bus_model'
+            ).order_by('-sold_count', 'pk').first()
+
+            results[size] = {}
+            for name, func in function_benchmarks(trip):
+                results[size][name] = measure(func, options['repeat'], options['iterations'])
+            for name, func in report_benchmarks():
+                results[size][name] = measure(func, options['repeat'], 1, setup=cache.clear)
+
+            for name, result in results[size].items():
+                self.stdout.write(
+                    f"  {name:45} {result['time'] * 1000:9.3f} мс  "
+                    f"{result['queries']:3} запитів  {result['peak_kb']:9.1f} КБ"
+                )
+        return results
+
+    def compare(self, results, baseline, threshold):
+        """Список погіршень відносно базових результатів"""
+        regressions = []
+        for size, benchmarks in results.items():
+            for name, result in benchmarks.items():
+                base = baseline.get(size, {}).get(name)
+                if base is None:
+                    continue
+                problems = []
+                if (result['time'] > base['time'] * (1 + threshold)
+                        and result['time'] - base['time'] > TIME_NOISE_SECONDS):
+                    problems.append(f"час {base['time'] * 1000:.3f} -> {result['time'] * 1000:.3f} мс")
+                if result['queries'] > base['queries']:
+                    problems.append(f"запити {base['queries']} -> {result['queries']}")
+                if (result['peak_kb'] > base['peak_kb'] * (1 + threshold)
+                        and result['peak_kb'] - base['peak_kb'] > MEMORY_NOISE_KB):
+                    problems.append(f"пам'ять {base['peak_kb']} -> {result['peak_kb']} КБ")
+                if problems:
+                    regressions.append(f"{size}/{name}")
+                    self.stdout.write(self.style.ERROR(f"{size}/{name}: {'; '.join(problems)}"))
+        return regressions
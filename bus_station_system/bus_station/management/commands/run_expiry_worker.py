@@ -0,0 +1,167 @@
+# bus_station/management/commands/run_expiry_worker.py
+import heapq
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+from bus_station.models import Ticket
+from bus_station.utils import cancel_booked_tickets
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Фоновий процес, що скасовує прострочені бронювання точно в строк'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=5,
+                            help='Як часто (с) підхоплювати нові бронювання')
+        parser.add_argument('--poll-overlap', type=float, default=60,
+                            help='На скільки (с) кожне опитування перекриває попереднє; '
+                                 'має бути більше за найдовшу транзакцію бронювання')
+        parser.add_argument('--resync-interval', type=float, default=300,
+                            help='Як часто (с) повністю звіряти чергу з базою')
+        parser.add_argument('--stats-interval', type=float, default=60,
+                            help='Як часто (с) виводити метрики затримки')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Максимум квитків в одному UPDATE')
+        parser.add_argument('--max-backoff', type=float, default=60,
+                            help='Найбільша пауза (с) між спробами після помилки бази даних')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+
+        # Купа (дедлайн, id квитка) та множина id, що вже в купі
+        self.deadlines = []
+        self.queued = set()
+        self.polled_at = None
+        self.poll_overlap = timedelta(seconds=options['poll_overlap'])
+        self.lags = []
+        self.cancelled_total = 0
+
+        self.stdout.write("Запуск обробника прострочених бронювань...")
+
+        # Перша ітерація одразу завантажує всі активні бронювання
+        now = time.monotonic()
+        next_poll = now + options['poll_interval']
+        next_resync = now
+        next_stats = now + options['stats_interval']
+        backoff = 0
+
+        try:
+            while self.running:
+                try:
+                    close_old_connections()
+                    self.expire_due()
+
+                    now = time.monotonic()
+                    if now >= next_resync:
+                        self.load_bookings(resync=True)
+                        next_resync = now + options['resync_interval']
+                        next_poll = now + options['poll_interval']
+                    elif now >= next_poll:
+                        self.load_bookings()
+                        next_poll = now + options['poll_interval']
+                except DatabaseError as e:
+                    # Перезапуск бази чи таймаут блокування не зупиняє обробник:
+                    # чекаємо дедалі довше, а потім повністю звіряємо чергу з базою,
+                    # бо квитки невдалої пачки вже вийшли з купи
+                    backoff = min(max(backoff * 2, 1), options['max_backoff'])
+                    logger.error(f"Помилка бази даних, повтор через {backoff:.0f} с: {e}")
+                    self.stderr.write(f"Помилка бази даних, повтор через {backoff:.0f} с: {e}")
+                    close_old_connections()
+                    time.sleep(backoff)
+                    next_resync = time.monotonic()
+                    continue
+                backoff = 0
+
+                if now >= next_stats:
+                    self.report_stats()
+                    next_stats = now + options['stats_interval']
+
+                time.sleep(max(0, min(next_poll - time.monotonic(), self.seconds_to_next_deadline())))
+        except KeyboardInterrupt:
+            pass
+
+        self.report_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Обробник зупинено, всього скасовано {self.cancelled_total} бронювань"
+        ))
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def load_bookings(self, resync=False):
+        """Додати до купи нові бронювання (або всі активні при повній звірці)"""
+        polled_at = timezone.now()
+        bookings = Ticket.objects.filter(status='booked')
+        if not resync:
+            # booking_time ставиться при вставці, а не при фіксації транзакції:
+            # квиток, зафіксований пізніше за опитування, підхопить наступне,
+            # бо кожне опитування перекриває попереднє на poll_overlap
+            bookings = bookings.filter(booking_time__gte=self.polled_at - self.poll_overlap)
+
+        added = 0
+        for pk, booking_time in bookings.values_list('pk', 'booking_time').iterator():
+            if pk in self.queued:
+                continue
+            heapq.heappush(self.deadlines, (booking_time + Ticket.BOOKING_TTL, pk))
+            self.queued.add(pk)
+            added += 1
+        self.polled_at = polled_at
+
+        if added:
+            logger.debug(f"Queued {added} bookings, {len(self.deadlines)} pending")
+
+    def seconds_to_next_deadline(self):
+        if not self.deadlines:
+            return float('inf')
+        return (self.deadlines[0][0] - timezone.now()).total_seconds()
+
+    def expire_due(self):
+        """Скасувати пачками всі бронювання, дедлайн яких уже настав"""
+        now = timezone.now()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            due = {}
+            while (self.deadlines and self.deadlines[0][0] <= now
+                   and len(due) < self.options['batch_size']):
+                deadline, pk = heapq.heappop(self.deadlines)
+                self.queued.discard(pk)
+                due[pk] = deadline
+
+            # Підтверджені або скасовані тим часом квитки UPDATE пропустить
+            cancelled = cancel_booked_tickets(Ticket.objects.filter(
+                pk__in=due,
+                status='booked',
+                booking_time__lte=now - Ticket.BOOKING_TTL
+            ))
+
+            cancelled_at = timezone.now()
+            for pk, ticket_number in cancelled:
+                lag = cancelled_at - due[pk]
+                self.lags.append(lag)
+                self.stdout.write(self.style.WARNING(
+                    f"Скасовано бронювання {ticket_number} (затримка {lag.total_seconds():.2f} с)"
+                ))
+            self.cancelled_total += len(cancelled)
+
+    def report_stats(self):
+        """Метрики затримки між дедлайном і фактичним скасуванням"""
+        if not self.lags:
+            return
+        lags = sorted(lag.total_seconds() for lag in self.lags)
+        p95 = lags[min(len(lags) - 1, int(len(lags) * 0.95))]
+        message = (
+            f"Скасовано {len(lags)} бронювань, затримка: "
+            f"середня {sum(lags) / len(lags):.2f} с, p95 {p95:.2f} с, макс. {lags[-1]:.2f} с; "
+            f"в черзі {len(self.deadlines)}"
+        )
+        self.stdout.write(message)
+        logger.info(message)
+        self.lags = []
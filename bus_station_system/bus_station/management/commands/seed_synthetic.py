@@ -0,0 +1,368 @@
+# bus_station/management/commands/seed_synthetic.py
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+import io
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from bus_station.models import Bus, BusModel, Destination, FuelPrice, Route, Ticket, Trip
+from bus_station.reports import refresh_report_facts
+from bus_station.utils import (allocate_ticket_number_block, calculate_base_price, calculate_distance_discount,
+                               format_ticket_number, load_fuel_price, rebuild_seat_maps, recount_trip_counters)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Обсяги на одиницю масштабу: --scale 1 дає близько мільйона квитків за рік
+DESTINATIONS_PER_SCALE = 25
+ROUTES_PER_SCALE = 200
+
+CITIES = [
+    'Київ', 'Львів', 'Одеса', 'Харків', 'Дніпро', 'Вінниця', 'Житомир', 'Рівне', 'Луцьк',
+    'Тернопіль', 'Хмельницький', 'Чернівці', 'Івано-Франківськ', 'Ужгород', 'Полтава',
+    'Черкаси', 'Чернігів', 'Суми', 'Кропивницький', 'Миколаїв', 'Запоріжжя', 'Херсон',
+    'Біла Церква', 'Умань', 'Кам\'янець-Подільський', 'Мукачево', 'Бердичів', 'Коломия',
+]
+
+# Назва, витрати пального на 100 км, кількість місць
+BUS_MODELS = [
+    ('Богдан А092', Decimal('18.50'), 20),
+    ('Mercedes-Benz Sprinter', Decimal('12.00'), 20),
+    ('Еталон А079', Decimal('20.00'), 29),
+    ('Ataman A093', Decimal('22.50'), 33),
+    ('Setra S 415', Decimal('27.00'), 49),
+    ('Neoplan Tourliner', Decimal('28.50'), 53),
+    ('MAN Lion\'s Coach', Decimal('30.00'), 57),
+]
+
+# Типові розклади та їхня частка серед маршрутів
+SCHEDULES = [
+    ('1,2,3,4,5,6,7', 50),
+    ('1,2,3,4,5', 20),
+    ('5,6,7', 15),
+    (None, 15),  # випадкові 2-4 дні
+]
+
+# Частки статусів для минулих і майбутніх рейсів
+PAST_STATUSES = (['sold', 'cancelled'], [90, 10])
+FUTURE_STATUSES = (['sold', 'booked', 'cancelled'], [55, 35, 10])
+
+REGION_CODES = ['AA', 'AI', 'BC', 'BH', 'AX', 'AE', 'AM', 'BO', 'CE', 'BX']
+
+# Порожнє значення у текстовому форматі COPY
+COPY_NULL = '\\N'
+# Як часто (квитків) виводити прогрес
+PROGRESS_EVERY = 1000000
+
+
+@contextmanager
+def ticket_batch_transaction(disable_triggers):
+    """
+    Транзакція однієї пачки квитків; на PostgreSQL - з вимкненими тригерами лічильників
+    ALTER TABLE тримає блокування таблиці квитків до фіксації, тому транзакція
+    охоплює лише одну пачку, і живі бронювання чекають не довше за її запис.
+    Лічильники пачки потім перераховуються одним UPDATE замість рядка за рядком.
+    """
+    with transaction.atomic():
+        if not disable_triggers:
+            yield
+            return
+        table = connection.ops.quote_name(Ticket._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+        try:
+            # Точка збереження: після помилки транзакція лишається придатною для ENABLE
+            with transaction.atomic():
+                yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+
+
+class Command(BaseCommand):
+    help = 'Синтетичні дані для навантажувальних тестів: маршрути, рейси за рік і мільйони квитків'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Масштаб: 1 - близько 200 маршрутів і мільйона квитків')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора (дані відтворювані)')
+        parser.add_argument('--start', help='Перша дата рейсів, РРРР-ММ-ДД (за замовчуванням - рік тому)')
+        parser.add_argument('--days', type=int, default=365, help='Кількість днів розкладу')
+        parser.add_argument('--days-ahead', type=int, default=30,
+                            help='Скільки днів розкладу після сьогодні (якщо не вказано --start)')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Рядків в одному INSERT/COPY')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Не використовувати COPY на PostgreSQL, лише bulk_create')
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0 or options['days'] < 1:
+            raise CommandError("Масштаб і кількість днів мають бути додатними")
+
+        today = timezone.now().date()
+        if options['start']:
+            try:
+                start_date = date.fromisoformat(options['start'])
+            except ValueError:
+                raise CommandError(f"Невірна дата: {options['start']}")
+        else:
+            start_date = today - timedelta(days=options['days'] - options['days_ahead'])
+        end_date = start_date + timedelta(days=options['days'] - 1)
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+
+        started = time.perf_counter()
+        last_trip_id = Trip.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        with transaction.atomic():
+            fuel_price = FuelPrice.objects.order_by('-date_updated').first()
+            if fuel_price is None:
+                fuel_price = FuelPrice.objects.create(price=Decimal('52.50'))
+
+            routes = self.create_routes(options['scale'])
+            trips_count = self.create_trips(routes, start_date, end_date)
+        self.stdout.write(
+            f"Створено {len(routes)} маршрутів і {trips_count} рейсів "
+            f"на {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
+        )
+
+        new_trips = Trip.objects.filter(pk__gt=last_trip_id)
+        # Номери для найбільшої можливої кількості квитків - одним коротким зверненням
+        # до лічильника, щоб не блокувати його на весь час завантаження
+        max_tickets = new_trips.aggregate(seats=Sum('bus__bus_model__seats_count'))['seats'] or 0
+        self.next_serial = allocate_ticket_number_block(max_tickets) if max_tickets else 0
+
+        tickets_count = self.create_tickets(routes, new_trips, fuel_price, use_copy)
+        self.stdout.write(f"Створено {tickets_count} квитків, {time.perf_counter() - started:.0f} с")
+
+        self.stdout.write("Підсумки звітів...")
+        refresh_report_facts(since=start_date, until=end_date)
+
+        load_fuel_price()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {elapsed:.0f} с: {len(routes)} маршрутів, {trips_count} рейсів, "
+            f"{tickets_count} квитків ({tickets_count / elapsed:.0f} квитків/с)"
+        ))
+        logger.info(f"Seeded {len(routes)} routes, {trips_count} trips, {tickets_count} tickets")
+
+    def create_routes(self, scale):
+        """Пункти прибуття, марки, автобуси і маршрути; повертає маршрути"""
+        rng = self.rng
+
+        destinations_count = max(1, round(DESTINATIONS_PER_SCALE * scale))
+        destinations = Destination.objects.bulk_create([
+            Destination(name=CITIES[index % len(CITIES)] + (
+                f" {index // len(CITIES) + 1}" if index >= len(CITIES) else ''
+            ))
+            for index in range(destinations_count)
+        ])
+
+        bus_models = BusModel.objects.bulk_create([
+            BusModel(name=name, fuel_consumption=consumption, seats_count=seats)
+            for name, consumption, seats in BUS_MODELS
+        ])
+
+        # Відстань пункту прибуття однакова для всіх його маршрутів
+        distances = {
+            destination.pk: Decimal(rng.randint(15, 900)) for destination in destinations
+        }
+
+        routes_count = max(1, round(ROUTES_PER_SCALE * scale))
+        last_route_id = Route.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        routes = []
+        buses = []
+        schedules, weights = zip(*SCHEDULES)
+        for index in range(routes_count):
+            destination = rng.choice(destinations)
+            distance = distances[destination.pk]
+            # Далекі рейси - великі автобуси, приміські - малі
+            bus_model = rng.choice(bus_models[4:] if distance > 300 else bus_models[:5])
+
+            days_of_week = rng.choices(schedules, weights)[0]
+            if days_of_week is None:
+                days_of_week = ','.join(map(str, sorted(rng.sample(range(1, 8), rng.randint(2, 4)))))
+            days_mask = 0
+            for day in Route.parse_days_of_week(days_of_week):
+                days_mask |= Route.weekday_bit(day)
+
+            departure = datetime.combine(date.min, dt_time(5)) + timedelta(minutes=5 * rng.randint(0, 216))
+            arrival = departure + timedelta(minutes=int(distance) + rng.randint(10, 60))
+
+            routes.append(Route(
+                number=str(100 + last_route_id + index),
+                tariff=Decimal(rng.randint(80, 250)) / 100,
+                days_of_week=days_of_week,
+                days_mask=days_mask,
+                destination=destination,
+                distance=distance,
+                departure_time=departure.time(),
+                arrival_time=arrival.time(),
+                bus_model=bus_model,
+            ))
+            buses.append(Bus(
+                bus_model=bus_model,
+                number=f"{rng.choice(REGION_CODES)}{rng.randint(0, 9999):04d}"
+                       f"{rng.choice(REGION_CODES)}"
+            ))
+
+        Route.objects.bulk_create(routes, batch_size=self.batch_size)
+        Bus.objects.bulk_create(buses, batch_size=self.batch_size)
+        # Кожен маршрут обслуговує власний автобус його марки
+        self.route_buses = {route.pk: bus.pk for route, bus in zip(routes, buses)}
+        return routes
+
+    def create_trips(self, routes, start_date, end_date):
+        """Рейси кожного маршруту в дні його розкладу; повертає їх кількість"""
+        dates = []
+        trip_date = start_date
+        while trip_date <= end_date:
+            dates.append(trip_date)
+            trip_date += timedelta(days=1)
+
+        trips = [
+            Trip(route_id=route.pk, bus_id=self.route_buses[route.pk], date=trip_date)
+            for route in routes
+            for trip_date in dates
+            if route.runs_on(trip_date.isoweekday())
+        ]
+        Trip.objects.bulk_create(trips, batch_size=self.batch_size)
+        return len(trips)
+
+    def create_tickets(self, routes, trips, fuel_price, use_copy):
+        """Квитки в змішаних статусах для кожного рейсу; повертає їх кількість"""
+        routes_by_id = {route.pk: route for route in routes}
+        prices = {
+            route.pk: (
+                calculate_base_price(route, fuel_price) * (Decimal('1') - calculate_distance_discount(route.distance))
+            ).quantize(Decimal('0.01'))
+            for route in routes
+        }
+
+        write = self.copy_tickets if use_copy else self.insert_tickets
+        batch = []
+        created = 0
+        next_progress = PROGRESS_EVERY
+        # Рейси читаються наперед: між пачками транзакції фіксуються
+        for trip_id, route_id, trip_date in list(trips.order_by('pk').values_list('pk', 'route_id', 'date')):
+            # Рейс у пам'яті лише для формату номера квитка
+            trip = Trip(pk=trip_id, route=routes_by_id[route_id], date=trip_date)
+            batch.extend(self.trip_tickets(trip, prices[route_id]))
+            if len(batch) >= self.batch_size:
+                created += self.write_batch(write, batch, use_copy)
+                batch = []
+                if created >= next_progress:
+                    self.stdout.write(f"  {created} квитків...")
+                    next_progress += PROGRESS_EVERY
+        if batch:
+            created += self.write_batch(write, batch, use_copy)
+        return created
+
+    def write_batch(self, write, batch, use_copy):
+        """
+        Записати пачку квитків цілих рейсів разом з лічильниками та картами місць цих рейсів
+        Карти записуються лише в базу: рейси нові, і публікувати кожну в кеш
+        немає сенсу - її прочитають з бази при першому запиті.
+        """
+        batch_trips = Trip.objects.filter(pk__in={row[0].pk for row in batch})
+        with ticket_batch_transaction(use_copy):
+            created = write(batch)
+            if use_copy:
+                recount_trip_counters(batch_trips)
+            rebuild_seat_maps(batch_trips, publish=False)
+        return created
+
+    def trip_tickets(self, trip, price):
+        """Рядки квитків одного рейсу: (рейс, місце, статус, бронювання, продаж, ціна)"""
+        rng = self.rng
+        route, trip_date = trip.route, trip.date
+        seats_count = route.bus_model.seats_count
+
+        # Пʼятниця та неділя заповнюються краще за інші дні
+        occupancy = rng.betavariate(2, 2.5)
+        if trip_date.isoweekday() in (5, 7):
+            occupancy = min(1.0, occupancy + 0.15)
+        seats = rng.sample(range(1, seats_count + 1), round(seats_count * occupancy))
+
+        departure = timezone.make_aware(datetime.combine(trip_date, route.departure_time))
+        statuses, weights = PAST_STATUSES if departure < self.now else FUTURE_STATUSES
+        rows = []
+        for seat_number, status in zip(seats, rng.choices(statuses, weights, k=len(seats))):
+            if status == 'booked':
+                # Активні бронювання - свіжі, інакше їх одразу скасує обробник прострочених
+                booking_time = self.now - timedelta(seconds=rng.randint(0, 3300))
+            else:
+                booking_time = min(
+                    departure - timedelta(minutes=rng.randint(10, 30 * 24 * 60)),
+                    self.now - timedelta(hours=2)
+                )
+            sold_time = booking_time + timedelta(minutes=rng.randint(1, 50)) if status == 'sold' else None
+            rows.append((trip, seat_number, status, booking_time, sold_time, price))
+        return rows
+
+    def ticket_numbers(self, batch):
+        """Номери з блоку, зарезервованого на початку завантаження"""
+        first = self.next_serial
+        self.next_serial += len(batch)
+        return [
+            format_ticket_number(row[0], first + index)
+            for index, row in enumerate(batch)
+        ]
+
+    def ticket_columns(self):
+        fields = ['trip', 'ticket_number', 'seat_number', 'status', 'booking_time', 'sold_time', 'price']
+        return ', '.join(connection.ops.quote_name(Ticket._meta.get_field(name).column) for name in fields)
+
+    def insert_tickets(self, batch):
+        """
+        Вставити пачку квитків одним executemany
+        Значення готуються вручну: компіляція bulk_create для мільйонів
+        рядків повільніша за саму вставку
+        """
+        ops = connection.ops
+        sql = (
+            f"INSERT INTO {ops.quote_name(Ticket._meta.db_table)} ({self.ticket_columns()}) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s)"
+        )
+        rows = [
+            (
+                trip.pk, ticket_number, seat_number, status,
+                ops.adapt_datetimefield_value(booking_time),
+                ops.adapt_datetimefield_value(sold_time),
+                ops.adapt_decimalfield_value(price, 10, 2),
+            )
+            for (trip, seat_number, status, booking_time, sold_time, price), ticket_number
+            in zip(batch, self.ticket_numbers(batch))
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        return len(batch)
+
+    def copy_tickets(self, batch):
+        """Завантажити пачку квитків через COPY (psycopg 3 або psycopg2)"""
+        sql = f"COPY {connection.ops.quote_name(Ticket._meta.db_table)} ({self.ticket_columns()}) FROM STDIN"
+
+        buffer = io.StringIO()
+        for (trip, seat_number, status, booking_time, sold_time, price), ticket_number in zip(
+                batch, self.ticket_numbers(batch)):
+            buffer.write(
+                f"{trip.pk}\t{ticket_number}\t{seat_number}\t{status}\t{booking_time.isoformat()}\t"
+                f"{sold_time.isoformat() if sold_time else COPY_NULL}\t{price}\n"
+            )
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, 'copy'):
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+            else:
+                raw_cursor.copy_expert(sql, buffer)
+        return len(batch)
@@ -0,0 +1,180 @@
+# bus_station/management/commands/stress_test.py
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import random
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+from bus_station.models import Ticket, Trip
+from bus_station.utils import book_seat, generate_ticket_number
+
+
+def generate_numbers(trip, count, threads):
+    """
+    Згенерувати count номерів квитків у кількох потоках одного процесу
+    Повертає (номери, помилки бази даних)
+    """
+    def worker(worker_count):
+        numbers, errors = [], []
+        try:
+            for _ in range(worker_count):
+                try:
+                    numbers.append(generate_ticket_number(trip))
+                except OperationalError as e:
+                    errors.append(f'OperationalError: {e}')
+            return numbers, errors
+        finally:
+            connection.close()
+
+    shares = [count // threads + (1 if index < count % threads else 0) for index in range(threads)]
+    numbers, errors = [], []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for worker_numbers, worker_errors in executor.map(worker, shares):
+            numbers.extend(worker_numbers)
+            errors.extend(worker_errors)
+    return numbers, errors
+
+
+class Command(BaseCommand):
+    help = 'Навантажувальна перевірка: паралельне бронювання одного рейсу або генерація номерів квитків'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=['booking', 'ticket_numbers'], help='Сценарій перевірки')
+        parser.add_argument('--trip', type=int, help='ID рейсу')
+        parser.add_argument('--threads', type=int, default=50, help='Кількість потоків')
+        parser.add_argument('--requests', type=int, default=300, help='Кількість спроб бронювання')
+        parser.add_argument('--seats', type=int, default=10,
+                            help='Скільки місць розігрується між потоками')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true',
+                            help='Не видаляти створені під час перевірки квитки')
+        parser.add_argument('--numbers', type=int, default=100000,
+                            help='Скільки номерів квитків згенерувати (ticket_numbers)')
+        parser.add_argument('--processes', type=int, default=4,
+                            help='Кількість процесів-воркерів (ticket_numbers)')
+
+    def handle(self, *args, **options):
+        getattr(self, f"run_{options['scenario']}")(options)
+
+    def get_trip(self, options):
+        trips = Trip.objects.select_related('route', 'bus__bus_model')
+        if options['trip'] is None:
+            trip = trips.order_by('-pk').first()
+            if trip is None:
+                raise CommandError("Немає жодного рейсу")
+            return trip
+        try:
+            return trips.get(pk=options['trip'])
+        except Trip.DoesNotExist:
+            raise CommandError(f"Рейс {options['trip']} не знайдено")
+
+    def run_booking(self, options):
+        if options['trip'] is None:
+            raise CommandError("Для сценарію booking потрібен --trip")
+        trip = self.get_trip(options)
+
+        free_seats = trip.get_available_seats()[:options['seats']]
+        if not free_seats:
+            raise CommandError("На рейсі немає вільних місць")
+
+        rng = random.Random(options['seed'])
+        attempts = [rng.choice(free_seats) for _ in range(options['requests'])]
+        start_id = Ticket.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        self.stdout.write(
+            f"{len(attempts)} спроб на {len(free_seats)} місць рейсу {trip} "
+            f"у {options['threads']} потоках..."
+        )
+
+        def attempt(seat_number):
+            try:
+                book_seat(trip.pk, seat_number)
+                return 'booked'
+            except ValidationError:
+                return 'conflict'
+            except OperationalError as e:
+                # Напр., "database is locked" у SQLite - спроба не вдалась, це помилка
+                return f'OperationalError: {e}'
+            except Exception as e:
+                return f'помилка {type(e).__name__}: {e}'
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            results = list(executor.map(attempt, attempts))
+        elapsed = time.perf_counter() - started
+        errors = [result for result in results if result not in ('booked', 'conflict')]
+
+        duplicates = Ticket.objects.filter(
+            trip=trip
+        ).exclude(
+            status='cancelled'
+        ).values('seat_number').annotate(
+            tickets=Count('id')
+        ).filter(tickets__gt=1)
+        duplicates = list(duplicates)
+
+        self.stdout.write(
+            f"Заброньовано: {results.count('booked')}, "
+            f"конфліктів: {results.count('conflict')}, "
+            f"помилок: {len(errors)}, "
+            f"{len(results) / elapsed:.1f} запитів/с"
+        )
+        for error in sorted(set(errors)):
+            self.stdout.write(self.style.WARNING(f"  {errors.count(error)} x {error}"))
+
+        if not options['keep']:
+            Ticket.objects.filter(trip=trip, pk__gt=start_id).delete()
+
+        if duplicates:
+            raise CommandError(f"Подвійний продаж місць: {duplicates}")
+        if results.count('booked') > len(free_seats):
+            raise CommandError("Заброньовано більше місць, ніж розігрувалось")
+        if errors:
+            raise CommandError(f"{len(errors)} із {len(results)} спроб завершились помилкою")
+        self.stdout.write(self.style.SUCCESS("Подвійного продажу місць не виявлено"))
+
+    def run_ticket_numbers(self, options):
+        trip = self.get_trip(options)
+        total, processes = options['numbers'], options['processes']
+        threads = max(1, options['threads'] // processes)
+        self.stdout.write(
+            f"Генерація {total} номерів квитків у {processes} процесах по {threads} потоків..."
+        )
+
+        # Дочірні процеси відкривають власні з'єднання з базою
+        connections.close_all()
+        shares = [total // processes + (1 if index < total % processes else 0) for index in range(processes)]
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=multiprocessing.get_context('fork')) as executor:
+            futures = [executor.submit(generate_numbers, trip, share, threads) for share in shares]
+            numbers, errors = [], []
+            for future in futures:
+                process_numbers, process_errors = future.result()
+                numbers.extend(process_numbers)
+                errors.extend(process_errors)
+        elapsed = time.perf_counter() - started
+
+        duplicates = len(numbers) - len(set(numbers))
+        too_long = [number for number in numbers if len(number) > Ticket._meta.get_field('ticket_number').max_length]
+        self.stdout.write(
+            f"Згенеровано: {len(numbers)}, дублікатів: {duplicates}, помилок: {len(errors)}, "
+            f"{len(numbers) / elapsed:.0f} номерів/с; приклад: {numbers[0] if numbers else '-'}"
+        )
+        for error in sorted(set(errors)):
+            self.stdout.write(self.style.WARNING(f"  {errors.count(error)} x {error}"))
+
+        if errors:
+            raise CommandError(f"{len(errors)} номерів не згенеровано через помилки бази даних")
+        if len(numbers) != total:
+            raise CommandError(f"Очікувалось {total} номерів, отримано {len(numbers)}")
+        if duplicates:
+            raise CommandError(f"Виявлено {duplicates} повторних номерів квитків")
+        if too_long:
+            raise CommandError(f"Номер довший за поле квитка: {too_long[0]}")
+        self.stdout.write(self.style.SUCCESS("Усі номери квитків унікальні"))
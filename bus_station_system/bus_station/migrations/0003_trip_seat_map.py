@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:11
+
+from django.db import migrations, models
+
+
+def fill_seat_maps(apps, schema_editor):
+    Trip = apps.get_model('bus_station', 'Trip')
+    Ticket = apps.get_model('bus_station', 'Ticket')
+
+    occupied = {}
+    tickets = Ticket.objects.exclude(status='cancelled').values_list('trip_id', 'seat_number')
+    for trip_id, seat_number in tickets.iterator():
+        occupied[trip_id] = occupied.get(trip_id, 0) | 1 << (seat_number - 1)
+
+    for trip_id, mask in occupied.items():
+        Trip.objects.filter(pk=trip_id).update(
+            seat_map=mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0002_add_trigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='seat_map',
+            field=models.BinaryField(default=b'', verbose_name='Карта зайнятих місць'),
+        ),
+        migrations.RunPython(fill_seat_maps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0003_trip_seat_map'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('trip', 'seat_number'), name='unique_active_seat_per_trip', violation_error_message='Місце вже зайняте'),
+        ),
+    ]
@@ -0,0 +1,216 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:14
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+# Зміни лічильників рейсу від одного рядка квитка (OLD або NEW)
+TICKET_DELTA = """
+    sold_count = sold_count {sign} CASE WHEN {row}.status = 'sold' THEN 1 ELSE 0 END,
+    booked_count = booked_count {sign} CASE WHEN {row}.status = 'booked' THEN 1 ELSE 0 END,
+    free_seats = free_seats {reverse} CASE WHEN {row}.status IN ('sold', 'booked') THEN 1 ELSE 0 END
+"""
+
+# Перерахунок вільних місць за кількістю місць марки автобуса рейсу
+FREE_SEATS = """
+    free_seats = (
+        SELECT m.seats_count
+        FROM bus_station_bus b
+        JOIN bus_station_busmodel m ON m.id = b.bus_model_id
+        WHERE b.id = bus_station_trip.bus_id
+    ) - sold_count - booked_count
+"""
+
+
+def ticket_delta(row, sign):
+    return TICKET_DELTA.format(row=row, sign=sign, reverse='-' if sign == '+' else '+')
+
+
+# Умови WHERE для рейсів, яких стосується зміна рейсу, автобуса або марки
+FREE_SEATS_TARGETS = {
+    'trip': 'id = NEW.id',
+    'bus': 'bus_id = NEW.id',
+    'busmodel': 'bus_id IN (SELECT id FROM bus_station_bus WHERE bus_model_id = NEW.id)',
+}
+FREE_SEATS_EVENTS = {
+    'trip': 'INSERT OR UPDATE OF bus_id',
+    'bus': 'UPDATE OF bus_model_id',
+    'busmodel': 'UPDATE OF seats_count',
+}
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER bus_station_ticket_counters_insert
+    AFTER INSERT ON bus_station_ticket
+    BEGIN
+        UPDATE bus_station_trip SET {ticket_delta('NEW', '+')} WHERE id = NEW.trip_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER bus_station_ticket_counters_update
+    AFTER UPDATE OF status, trip_id ON bus_station_ticket
+    BEGIN
+        UPDATE bus_station_trip SET {ticket_delta('OLD', '-')} WHERE id = OLD.trip_id;
+        UPDATE bus_station_trip SET {ticket_delta('NEW', '+')} WHERE id = NEW.trip_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER bus_station_ticket_counters_delete
+    AFTER DELETE ON bus_station_ticket
+    BEGIN
+        UPDATE bus_station_trip SET {ticket_delta('OLD', '-')} WHERE id = OLD.trip_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER bus_station_trip_free_seats_insert
+    AFTER INSERT ON bus_station_trip
+    BEGIN
+        UPDATE bus_station_trip SET {FREE_SEATS} WHERE {FREE_SEATS_TARGETS['trip']};
+    END
+    """,
+    f"""
+    CREATE TRIGGER bus_station_trip_free_seats_update
+    AFTER UPDATE OF bus_id ON bus_station_trip
+    BEGIN
+        UPDATE bus_station_trip SET {FREE_SEATS} WHERE {FREE_SEATS_TARGETS['trip']};
+    END
+    """,
+    f"""
+    CREATE TRIGGER bus_station_bus_free_seats
+    AFTER UPDATE OF bus_model_id ON bus_station_bus
+    BEGIN
+        UPDATE bus_station_trip SET {FREE_SEATS} WHERE {FREE_SEATS_TARGETS['bus']};
+    END
+    """,
+    f"""
+    CREATE TRIGGER bus_station_busmodel_free_seats
+    AFTER UPDATE OF seats_count ON bus_station_busmodel
+    BEGIN
+        UPDATE bus_station_trip SET {FREE_SEATS} WHERE {FREE_SEATS_TARGETS['busmodel']};
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {name}" for name in (
+        'bus_station_ticket_counters_insert',
+        'bus_station_ticket_counters_update',
+        'bus_station_ticket_counters_delete',
+        'bus_station_trip_free_seats_insert',
+        'bus_station_trip_free_seats_update',
+        'bus_station_bus_free_seats',
+        'bus_station_busmodel_free_seats',
+    )
+]
+
+POSTGRESQL_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE FUNCTION bus_station_ticket_counters() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE bus_station_trip SET {ticket_delta('OLD', '-')} WHERE id = OLD.trip_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE bus_station_trip SET {ticket_delta('NEW', '+')} WHERE id = NEW.trip_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER bus_station_ticket_counters
+    AFTER INSERT OR UPDATE OF status, trip_id OR DELETE ON bus_station_ticket
+    FOR EACH ROW EXECUTE FUNCTION bus_station_ticket_counters()
+    """,
+] + [
+    statement
+    for table, target in FREE_SEATS_TARGETS.items()
+    for statement in (
+        f"""
+        CREATE OR REPLACE FUNCTION bus_station_{table}_free_seats() RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE bus_station_trip SET {FREE_SEATS} WHERE {target};
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE TRIGGER bus_station_{table}_free_seats
+        AFTER {FREE_SEATS_EVENTS[table]} ON bus_station_{table}
+        FOR EACH ROW EXECUTE FUNCTION bus_station_{table}_free_seats()
+        """,
+    )
+]
+
+POSTGRESQL_DROP = [
+    "DROP TRIGGER IF EXISTS bus_station_ticket_counters ON bus_station_ticket",
+    "DROP FUNCTION IF EXISTS bus_station_ticket_counters()",
+] + [
+    statement
+    for table in FREE_SEATS_TARGETS
+    for statement in (
+        f"DROP TRIGGER IF EXISTS bus_station_{table}_free_seats ON bus_station_{table}",
+        f"DROP FUNCTION IF EXISTS bus_station_{table}_free_seats()",
+    )
+]
+
+TRIGGERS = {'sqlite': SQLITE_TRIGGERS, 'postgresql': POSTGRESQL_TRIGGERS}
+DROP_TRIGGERS = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}
+
+
+def create_triggers(apps, schema_editor):
+    for statement in TRIGGERS.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    for statement in DROP_TRIGGERS.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def fill_counters(apps, schema_editor):
+    Trip = apps.get_model('bus_station', 'Trip')
+    Ticket = apps.get_model('bus_station', 'Ticket')
+
+    def tickets_count(status):
+        return Coalesce(models.Subquery(
+            Ticket.objects.filter(
+                trip=models.OuterRef('pk'),
+                status=status
+            ).values('trip').annotate(count=models.Count('id')).values('count')
+        ), 0)
+
+    seats_count = models.Subquery(
+        Trip.objects.filter(pk=models.OuterRef('pk')).values('bus__bus_model__seats_count')
+    )
+    Trip.objects.update(
+        sold_count=tickets_count('sold'),
+        booked_count=tickets_count('booked'),
+        free_seats=seats_count - tickets_count('sold') - tickets_count('booked')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0004_ticket_unique_active_seat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Заброньовано квитків'),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='free_seats',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Вільних місць'),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='sold_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Продано квитків'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
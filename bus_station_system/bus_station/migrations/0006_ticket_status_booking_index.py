@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0005_trip_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'booking_time'], name='ticket_status_booking_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:17
+
+from django.db import migrations, models
+
+
+def fill_days_masks(apps, schema_editor):
+    Route = apps.get_model('bus_station', 'Route')
+    for route in Route.objects.only('pk', 'days_of_week'):
+        days_mask = 0
+        for day in route.days_of_week.split(','):
+            if day.strip():
+                days_mask |= 1 << (int(day.strip()) - 1)
+        Route.objects.filter(pk=route.pk).update(days_mask=days_mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0006_ticket_status_booking_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='days_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, verbose_name='Дні тижня виїзду (бітова маска)'),
+        ),
+        migrations.RunPython(fill_days_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0007_route_days_mask'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['trip', 'status'], name='ticket_trip_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('status', 'sold')), fields=['sold_time'], name='ticket_sold_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-booking_time', '-id'], name='ticket_booking_time_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['date'], name='trip_date_idx'),
+        ),
+    ]
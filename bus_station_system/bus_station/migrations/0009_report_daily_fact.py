@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_report_facts(apps, schema_editor):
+    Trip = apps.get_model('bus_station', 'Trip')
+    ReportDailyFact = apps.get_model('bus_station', 'ReportDailyFact')
+    rows = Trip.objects.values(
+        'date', 'route_id', 'route__destination_id', 'bus__bus_model_id'
+    ).annotate(
+        trip_count=Count('id'),
+        seats_count=Sum('bus__bus_model__seats_count'),
+        sold_total=Sum('sold_count'),
+        booked_total=Sum('booked_count')
+    ).order_by()
+    ReportDailyFact.objects.bulk_create(
+        (
+            ReportDailyFact(
+                date=row['date'],
+                route_id=row['route_id'],
+                destination_id=row['route__destination_id'],
+                bus_model_id=row['bus__bus_model_id'],
+                weekday=row['date'].isoweekday(),
+                trips=row['trip_count'],
+                seats=row['seats_count'],
+                sold=row['sold_total'],
+                booked=row['booked_total'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='День тижня (1 - Понеділок)')),
+                ('trips', models.PositiveIntegerField(default=0, verbose_name='Рейсів')),
+                ('seats', models.PositiveIntegerField(default=0, verbose_name='Місць')),
+                ('sold', models.PositiveIntegerField(default=0, verbose_name='Продано квитків')),
+                ('booked', models.PositiveIntegerField(default=0, verbose_name='Заброньовано квитків')),
+                ('bus_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bus_station.busmodel', verbose_name='Марка автобуса')),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bus_station.destination', verbose_name='Пункт прибуття')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bus_station.route', verbose_name='Маршрут')),
+            ],
+            options={
+                'verbose_name': 'Денний підсумок рейсів',
+                'verbose_name_plural': 'Денні підсумки рейсів',
+                'indexes': [models.Index(fields=['date', 'destination'], name='fact_date_destination_idx'), models.Index(fields=['weekday', 'date'], name='fact_weekday_date_idx')],
+                'unique_together': {('date', 'route')},
+            },
+        ),
+        migrations.RunPython(fill_report_facts, migrations.RunPython.noop),
+    ]
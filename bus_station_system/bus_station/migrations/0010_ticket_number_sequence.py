@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:32
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+counters = import_module('bus_station.migrations.0005_trip_counters')
+
+
+def create_ticket_sequence(apps, schema_editor):
+    TicketNumberSequence = apps.get_model('bus_station', 'TicketNumberSequence')
+    TicketNumberSequence.objects.get_or_create(name='ticket')
+
+
+def restore_ticket_triggers(apps, schema_editor):
+    # Зміну поля SQLite виконує перебудовою таблиці квитків, і тригери
+    # лічильників рейсів (міграція 0005) зникають разом зі старою таблицею
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in counters.SQLITE_DROP + counters.SQLITE_TRIGGERS:
+        if 'bus_station_ticket_counters' in sql:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_station', '0009_report_daily_fact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Назва')),
+                ('last_value', models.BigIntegerField(default=0, verbose_name='Останній виданий номер')),
+            ],
+            options={
+                'verbose_name': 'Лічильник номерів квитків',
+                'verbose_name_plural': 'Лічильники номерів квитків',
+            },
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_ticket_triggers),
+        migrations.AlterField(
+            model_name='ticket',
+            name='ticket_number',
+            field=models.CharField(max_length=32, unique=True, verbose_name='№ квитка'),
+        ),
+        migrations.RunPython(restore_ticket_triggers, migrations.RunPython.noop),
+        migrations.RunPython(create_ticket_sequence, migrations.RunPython.noop),
+    ]
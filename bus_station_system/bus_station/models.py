@@ -2,7 +2,15 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from decimal import Decimal
+from datetime import timedelta
+
+
+def pack_seat_map(seat_numbers):
+    """Упакувати номери зайнятих місць у бітову маску (біт N-1 відповідає місцю N)"""
+    mask = 0
+    for seat_number in seat_numbers:
+        mask |= 1 << (seat_number - 1)
+    return mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
 
 
 class Destination(models.Model):
@@ -77,9 +85,52 @@ class Route(models.Model):
         verbose_name="Марка автобуса"
     )
 
+    days_mask = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name="Дні тижня виїзду (бітова маска)"
+    )
+
+    @staticmethod
+    def weekday_bit(weekday):
+        """Біт дня тижня в масці (1 - Понеділок, 7 - Неділя)"""
+        return 1 << (weekday - 1)
+
+    @classmethod
+    def parse_days_of_week(cls, days_of_week):
+        return [int(day.strip()) for day in days_of_week.split(',') if day.strip()]
+
+    @classmethod
+    def masks_for_weekday(cls, weekday):
+        """Усі значення маски, що містять цей день (для індексованого IN)"""
+        return [mask for mask in range(1, 128) if mask & cls.weekday_bit(weekday)]
+
+    def runs_on(self, weekday):
+        return bool(self.days_mask & self.weekday_bit(weekday))
+
     def get_days_of_week_display(self):
-        days = [int(day.strip()) for day in self.days_of_week.split(',')]
-        return ', '.join([dict(self.DAYS_OF_WEEK).get(day, '') for day in days])
+        return ', '.join([name for day, name in self.DAYS_OF_WEEK if self.runs_on(day)])
+
+    def clean(self):
+        try:
+            days = self.parse_days_of_week(self.days_of_week)
+        except ValueError:
+            days = None
+        if not days or any(day not in dict(self.DAYS_OF_WEEK) for day in days):
+            raise ValidationError(
+                {'days_of_week': "Вкажіть номери днів тижня від 1 до 7 через кому"}
+            )
+
+    def save(self, *args, **kwargs):
+        # Маска завжди відповідає рядку днів тижня
+        self.days_mask = 0
+        for day in self.parse_days_of_week(self.days_of_week):
+            self.days_mask |= self.weekday_bit(day)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'days_of_week' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'days_mask'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Рейс {self.number} - {self.destination.name}"
@@ -105,52 +156,78 @@ class Trip(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, verbose_name="Маршрут")
     bus = models.ForeignKey(Bus, on_delete=models.CASCADE, verbose_name="Автобус")
     date = models.DateField(verbose_name="Дата виїзду")
+    seat_map = models.BinaryField(
+        default=b'',
+        editable=False,
+        verbose_name="Карта зайнятих місць"
+    )
+    # Лічильники підтримуються тригерами бази даних (міграція 0005)
+    sold_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Продано квитків")
+    booked_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Заброньовано квитків")
+    free_seats = models.IntegerField(default=0, editable=False, verbose_name="Вільних місць")
+
+    # Поля, які змінює лише база даних або сервіси квитків
+    DENORMALIZED_FIELDS = ('seat_map', 'sold_count', 'booked_count', 'free_seats')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запам'ятовуємо дату та маршрут, з якими рейс було завантажено
+        instance._loaded_schedule = (instance.__dict__.get('date'), instance.__dict__.get('route_id'))
+        return instance
+
+    def get_seat_mask(self):
+        """Бітова маска зайнятих (проданих або заброньованих) місць"""
+        return int.from_bytes(bytes(self.seat_map or b''), 'little')
+
+    def is_seat_free(self, seat_number):
+        return not (self.get_seat_mask() >> (seat_number - 1)) & 1
+
+    def get_available_seats(self):
+        mask = self.get_seat_mask()
+        return [
+            seat for seat in range(1, self.bus.bus_model.seats_count + 1)
+            if not (mask >> (seat - 1)) & 1
+        ]
+
+    def get_adjacent_free_seats(self, count):
+        """Перші count вільних місць поспіль (за номерами) або None"""
+        mask = self.get_seat_mask()
+        run = []
+        for seat in range(1, self.bus.bus_model.seats_count + 1):
+            if (mask >> (seat - 1)) & 1:
+                run = []
+                continue
+            run.append(seat)
+            if len(run) == count:
+                return run
+        return None
+
+    def get_occupied_seats_count(self):
+        return self.get_seat_mask().bit_count()
 
     def calculate_ticket_price(self, sold_tickets_count=0):
         """Розрахунок вартості квитка з урахуванням знижок"""
-        try:
-            fuel_price = FuelPrice.objects.latest('date_updated')
-        except FuelPrice.DoesNotExist:
-            fuel_price = None
-
-        if not fuel_price:
-            return Decimal('0')
-
-        # Базова ціна за формулою
-        base_price = (
-                self.route.tariff * self.route.distance / Decimal('100') +
-                self.route.bus_model.fuel_consumption * fuel_price.price
-        )
-
-        # Знижка за відстанню
-        discount = Decimal('0')
-        if self.route.distance <= Decimal('25'):
-            discount += Decimal('0.15')  # 15% знижка
-
-        # Знижка за наповненістю
-        if sold_tickets_count >= 50:
-            discount += Decimal('0.50')
-        elif sold_tickets_count >= 40:
-            discount += Decimal('0.40')
-        elif sold_tickets_count >= 30:
-            discount += Decimal('0.30')
-        elif sold_tickets_count >= 20:
-            discount += Decimal('0.20')
-        elif sold_tickets_count >= 10:
-            discount += Decimal('0.10')
-
-        # Застосовуємо знижку
-        final_price = base_price * (Decimal('1') - discount)
-        return max(final_price, Decimal('0'))  # Ціна не може бути від'ємною
+        from .utils import calculate_final_ticket_price
+        return calculate_final_ticket_price(self, sold_tickets_count)
 
     def get_sold_tickets_count(self):
-        return self.ticket_set.filter(status='sold').count()
+        return self.sold_count
 
     def clean(self):
         # Перевірка, що автобус відповідає марці маршруту
         if self.bus.bus_model != self.route.bus_model:
             raise ValidationError("Автобус повинен бути тієї ж марки, що вказана в маршруті")
 
+    def save(self, *args, **kwargs):
+        # Не перезаписуємо лічильники та карту місць застарілими значеннями з пам'яті
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.route.number} - {self.date}"
 
@@ -158,6 +235,10 @@ class Trip(models.Model):
         verbose_name = "Рейс"
         verbose_name_plural = "Рейси"
         unique_together = ['route', 'date']
+        indexes = [
+            # Фільтр за датою: список рейсів, статистика дня, звіти
+            models.Index(fields=['date'], name='trip_date_idx'),
+        ]
 
 
 class Ticket(models.Model):
@@ -167,8 +248,11 @@ class Ticket(models.Model):
         ('cancelled', 'Скасовано'),
     ]
 
+    # Скільки діє бронювання до автоматичного скасування
+    BOOKING_TTL = timedelta(hours=1)
+
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE, verbose_name="Рейс")
-    ticket_number = models.CharField(max_length=20, unique=True, verbose_name="№ квитка")
+    ticket_number = models.CharField(max_length=32, unique=True, verbose_name="№ квитка")
     seat_number = models.PositiveIntegerField(verbose_name="№ місця")
     status = models.CharField(
         max_length=10,
@@ -184,28 +268,43 @@ class Ticket(models.Model):
         verbose_name="Сума, сплачена за квиток"
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запам'ятовуємо рейс, з яким квиток було завантажено
+        instance._loaded_trip_id = instance.__dict__.get('trip_id')
+        return instance
+
     def is_booking_expired(self):
         """Перевірка чи минула 1 година з моменту бронювання"""
-        if self.status == 'booked':
+        # Ще не збережений квиток (форма додавання в адмінці) не має часу бронювання
+        if self.status == 'booked' and self.booking_time:
             time_passed = timezone.now() - self.booking_time
-            return time_passed.total_seconds() > 3600  # 1 година
+            return time_passed > self.BOOKING_TTL
         return False
 
     def clean(self):
+        if not self.trip_id:
+            return
+
         # Перевірка, що місце не перевищує кількість місць в автобусі
         if self.seat_number > self.trip.bus.bus_model.seats_count:
-            raise ValidationError(
-                f"Номер місця не може бути більшим за {self.trip.bus.bus_model.seats_count}"
-            )
+            raise ValidationError({
+                'seat_number': f"Номер місця не може бути більшим за {self.trip.bus.bus_model.seats_count}"
+            })
 
         # Перевірка, що місце не зайняте в цьому рейсі
-        existing_ticket = Ticket.objects.filter(
-            trip=self.trip,
-            seat_number=self.seat_number
-        ).exclude(pk=self.pk).exclude(status='cancelled').first()
-
-        if existing_ticket:
-            raise ValidationError(f"Місце {self.seat_number} вже зайняте")
+        if self._state.adding:
+            # Для нового квитка достатньо карти місць вже завантаженого рейсу
+            seat_taken = not self.trip.is_seat_free(self.seat_number)
+        else:
+            seat_taken = Ticket.objects.filter(
+                trip=self.trip,
+                seat_number=self.seat_number
+            ).exclude(pk=self.pk).exclude(status='cancelled').exists()
+
+        if seat_taken:
+            raise ValidationError({'seat_number': f"Місце {self.seat_number} вже зайняте"})
 
     def save(self, *args, **kwargs):
         # Автоматичне встановлення sold_time при зміні статусу на 'sold'
@@ -218,4 +317,65 @@ class Ticket(models.Model):
 
     class Meta:
         verbose_name = "Квиток"
-        verbose_name_plural = "Квитки"
\ No newline at end of file
+        verbose_name_plural = "Квитки"
+        indexes = [
+            # Пошук прострочених бронювань
+            models.Index(fields=['status', 'booking_time'], name='ticket_status_booking_idx'),
+            # Квитки рейсу за статусом
+            models.Index(fields=['trip', 'status'], name='ticket_trip_status_idx'),
+            # Продані квитки за часом продажу (частковий індекс там, де він підтримується)
+            models.Index(
+                fields=['sold_time'],
+                condition=models.Q(status='sold'),
+                name='ticket_sold_time_idx',
+            ),
+            # Список квитків, новіші першими
+            models.Index(fields=['-booking_time', '-id'], name='ticket_booking_time_desc_idx'),
+        ]
+        constraints = [
+            # Одне активне (не скасоване) місце на рейс
+            models.UniqueConstraint(
+                fields=['trip', 'seat_number'],
+                condition=~models.Q(status='cancelled'),
+                name='unique_active_seat_per_trip',
+                violation_error_message="Місце вже зайняте",
+            ),
+        ]
+
+
+class ReportDailyFact(models.Model):
+    """Денні підсумки рейсів маршруту для звітів (підтримуються інкрементально)"""
+    date = models.DateField(verbose_name="Дата")
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, verbose_name="Маршрут")
+    destination = models.ForeignKey(Destination, on_delete=models.CASCADE, verbose_name="Пункт прибуття")
+    bus_model = models.ForeignKey(BusModel, on_delete=models.CASCADE, verbose_name="Марка автобуса")
+    weekday = models.PositiveSmallIntegerField(verbose_name="День тижня (1 - Понеділок)")
+    trips = models.PositiveIntegerField(default=0, verbose_name="Рейсів")
+    seats = models.PositiveIntegerField(default=0, verbose_name="Місць")
+    sold = models.PositiveIntegerField(default=0, verbose_name="Продано квитків")
+    booked = models.PositiveIntegerField(default=0, verbose_name="Заброньовано квитків")
+
+    def __str__(self):
+        return f"{self.date} - {self.route_id}"
+
+    class Meta:
+        verbose_name = "Денний підсумок рейсів"
+        verbose_name_plural = "Денні підсумки рейсів"
+        unique_together = ['date', 'route']
+        indexes = [
+            models.Index(fields=['date', 'destination'], name='fact_date_destination_idx'),
+            models.Index(fields=['weekday', 'date'], name='fact_weekday_date_idx'),
+        ]
+
+
+class TicketNumberSequence(models.Model):
+    """Лічильник номерів квитків; процеси забирають з нього цілі блоки номерів"""
+    name = models.CharField(max_length=50, unique=True, verbose_name="Назва")
+    last_value = models.BigIntegerField(default=0, verbose_name="Останній виданий номер")
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+    class Meta:
+        verbose_name = "Лічильник номерів квитків"
+        verbose_name_plural = "Лічильники номерів квитків"
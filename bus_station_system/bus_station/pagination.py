@@ -0,0 +1,192 @@
+# bus_station/pagination.py
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'bus_station.pagination'
+# До скількох записів рахується наближена кількість
+APPROXIMATE_COUNT_LIMIT = 1000
+
+
+def _resolve_field(model, path):
+    """Поле моделі за шляхом на кшталт 'route__departure_time'"""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _value_from_object(obj, path):
+    for attr in path.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def approximate_count(queryset, limit=APPROXIMATE_COUNT_LIMIT):
+    """
+    Наближена кількість записів без повного COUNT(*)
+    Для нефільтрованої таблиці PostgreSQL - оцінка планувальника,
+    інакше - точний підрахунок, але не більше limit + 1 рядків.
+    Повертає (кількість, чи_точна)
+    """
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] > limit:
+            return row[0], False
+
+    count = queryset.order_by().values('pk')[:limit + 1].count()
+    return min(count, limit), count <= limit
+
+
+class KeysetPage:
+    """Сторінка курсорної пагінації з непрозорими токенами сусідніх сторінок"""
+    is_keyset = True
+
+    def __init__(self, object_list, ordering, has_next, has_previous, count_source=None):
+        self.object_list = object_list
+        self.ordering = ordering
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.count_source = count_source
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _cursor(self, obj, direction):
+        keys = []
+        for field in self.ordering:
+            value = _value_from_object(obj, field.lstrip('-'))
+            # Дати та час - у ISO-форматі, назад їх розбирає to_python поля
+            keys.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps({'d': direction, 'k': keys}, salt=CURSOR_SALT, compress=True)
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return self._cursor(self.object_list[-1], 'n')
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return self._cursor(self.object_list[0], 'p')
+
+    @cached_property
+    def last_cursor(self):
+        return signing.dumps({'d': 'p', 'k': None}, salt=CURSOR_SALT, compress=True)
+
+    @cached_property
+    def approximate_count(self):
+        if self.count_source is None:
+            return None
+        return approximate_count(self.count_source)
+
+    async def aload_approximate_count(self):
+        """Порахувати кількість заздалегідь: шаблон async-view не може йти в базу"""
+        if 'approximate_count' not in self.__dict__:
+            self.approximate_count = (
+                None if self.count_source is None
+                else await sync_to_async(approximate_count)(self.count_source)
+            )
+
+
+class KeysetPaginationMixin:
+    """
+    Курсорна (seek) пагінація для ListView замість OFFSET та COUNT(*)
+    keyset_ordering має закінчуватися унікальним полем (зазвичай id),
+    щоб порядок був повним і жоден запис не загубився між сторінками.
+    """
+    keyset_ordering = ('-id',)
+    cursor_kwarg = 'cursor'
+    show_approximate_count = True
+
+    def paginate_queryset(self, queryset, page_size):
+        direction, keys, page_queryset = self.keyset_page_queryset(queryset, page_size)
+        return self.keyset_page(queryset, list(page_queryset), direction, keys, page_size)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Асинхронний варіант paginate_queryset для async-views"""
+        direction, keys, page_queryset = self.keyset_page_queryset(queryset, page_size)
+        rows = [obj async for obj in page_queryset]
+        result = self.keyset_page(queryset, rows, direction, keys, page_size)
+        await result[1].aload_approximate_count()
+        return result
+
+    def keyset_page_queryset(self, queryset, page_size):
+        """(напрямок, ключі, запит на page_size + 1 рядків сторінки)"""
+        direction, keys = self.decode_cursor(self.request.GET.get(self.cursor_kwarg))
+        ordering = list(self.keyset_ordering)
+
+        page_queryset = queryset
+        if keys is not None:
+            page_queryset = page_queryset.filter(self.keyset_filter(queryset.model, ordering, keys, direction))
+
+        if direction == 'p':
+            # Назад - читаємо у зворотному порядку і розвертаємо сторінку
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}' for field in ordering
+            ]
+        return direction, keys, page_queryset.order_by(*ordering)[:page_size + 1]
+
+    def keyset_page(self, queryset, rows, direction, keys, page_size):
+        """Результат у форматі paginate_queryset з прочитаних рядків"""
+        has_more = len(rows) > page_size
+        if direction == 'p':
+            object_list = rows[:page_size][::-1]
+            has_next, has_previous = keys is not None, has_more
+        else:
+            object_list = rows[:page_size]
+            has_next, has_previous = has_more, keys is not None
+
+        page = KeysetPage(
+            object_list, list(self.keyset_ordering), has_next, has_previous,
+            count_source=queryset if self.show_approximate_count else None
+        )
+        return None, page, object_list, page.has_other_pages()
+
+    def decode_cursor(self, token):
+        """(напрямок, ключі) з токена; зіпсований токен - перша сторінка"""
+        if not token:
+            return 'n', None
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            return 'n', None
+        keys = data.get('k')
+        if keys is not None and len(keys) != len(self.keyset_ordering):
+            return 'n', None
+        return data.get('d', 'n'), keys
+
+    @staticmethod
+    def keyset_filter(model, ordering, keys, direction):
+        """
+        Умова "після ключа" в порядку ordering (або "перед ним" для direction='p')
+        (a, b, c) > (x, y, z)  =>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        """
+        values = [
+            _resolve_field(model, field.lstrip('-')).to_python(key)
+            for field, key in zip(ordering, keys)
+        ]
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending == (direction == 'n') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
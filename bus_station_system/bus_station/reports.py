@@ -0,0 +1,284 @@
+# bus_station/reports.py
+from collections import defaultdict
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from .models import ReportDailyFact, Route, Ticket, Trip
+
+REPORT_VERSION_KEY = 'reports:data_version'
+REPORT_DEFAULT_TTL = 300
+# Версія даних живе у спільному кеші; обмежений TTL - запобіжник для кешу,
+# локального для процесу, де зміну версії з інших процесів не видно
+REPORT_VERSION_TTL = getattr(settings, 'REPORT_DATA_VERSION_TTL', REPORT_DEFAULT_TTL)
+# Скільки секунд інші запити чекають, поки перший рахує той самий звіт
+REPORT_LOCK_TIMEOUT = 30
+REPORT_LOCK_WAIT = 5
+# Скільки дат оновлюється одним запитом у refresh_schedule_facts
+SCHEDULE_FACTS_CHUNK = 200
+
+
+# ===== КЕШ ЗВІТІВ =====
+
+def get_data_version():
+    """Поточна версія даних звітів (змінюється при кожному записі)"""
+    version = cache.get(REPORT_VERSION_KEY)
+    if version is None:
+        cache.add(REPORT_VERSION_KEY, time.time_ns(), timeout=REPORT_VERSION_TTL)
+        version = cache.get(REPORT_VERSION_KEY)
+    return version
+
+
+async def aget_data_version():
+    """Асинхронний варіант get_data_version"""
+    version = await cache.aget(REPORT_VERSION_KEY)
+    if version is None:
+        await cache.aadd(REPORT_VERSION_KEY, time.time_ns(), timeout=REPORT_VERSION_TTL)
+        version = await cache.aget(REPORT_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    """
+    Зробити застарілими всі закешовані звіти
+    Нова версія записується після фіксації транзакції, щоб звіт
+    не закешувався за версією, яка ще бачить старі дані.
+    """
+    transaction.on_commit(
+        lambda: cache.set(REPORT_VERSION_KEY, time.time_ns(), timeout=REPORT_VERSION_TTL)
+    )
+
+
+def _report_cache_key(name, params):
+    params_hash = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f"report:{name}:{get_data_version()}:{params_hash}"
+
+
+def cached_report(name, params, compute, refresh=False):
+    """
+    Результат звіту з кешу за назвою, параметрами та версією даних
+    При промаху рахує лише один запит, інші чекають на його результат.
+    refresh=True - перерахувати звіт, не дивлячись у кеш.
+    """
+    key = _report_cache_key(name, params)
+    if not refresh:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    lock_key = f"{key}:lock"
+    locked = not refresh and cache.add(lock_key, True, REPORT_LOCK_TIMEOUT)
+    if not refresh and not locked:
+        deadline = time.monotonic() + REPORT_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            result = cache.get(key)
+            if result is not None:
+                return result
+
+    try:
+        result = compute()
+        ttl = getattr(settings, 'REPORT_CACHE_TTLS', {}).get(name, REPORT_DEFAULT_TTL)
+        cache.set(key, result, ttl)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return result
+
+
+# ===== ФАКТИ ЗВІТІВ =====
+
+def _rebuild_facts(scope):
+    """
+    Перебудувати денні підсумки в межах умови scope
+    Умова має спільні для Trip і ReportDailyFact поля (date, route_id)
+    """
+    with transaction.atomic():
+        ReportDailyFact.objects.filter(scope).delete()
+
+        rows = Trip.objects.filter(scope).values(
+            'date',
+            'route_id',
+            'route__destination_id',
+            'bus__bus_model_id'
+        ).annotate(
+            trip_count=Count('id'),
+            seats_count=Sum('bus__bus_model__seats_count'),
+            sold_total=Sum('sold_count'),
+            booked_total=Sum('booked_count')
+        ).order_by()
+
+        facts = ReportDailyFact.objects.bulk_create(
+            (
+                ReportDailyFact(
+                    date=row['date'],
+                    route_id=row['route_id'],
+                    destination_id=row['route__destination_id'],
+                    bus_model_id=row['bus__bus_model_id'],
+                    weekday=row['date'].isoweekday(),
+                    trips=row['trip_count'],
+                    seats=row['seats_count'],
+                    sold=row['sold_total'],
+                    booked=row['booked_total'],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000
+        )
+    bump_data_version()
+    return len(facts)
+
+
+def refresh_report_facts(since=None, until=None):
+    """
+    Перебудувати денні підсумки за період (за замовчуванням - уся історія)
+    Повертає кількість записаних підсумків
+    """
+    scope = Q()
+    if since:
+        scope &= Q(date__gte=since)
+    if until:
+        scope &= Q(date__lte=until)
+    return _rebuild_facts(scope)
+
+
+def refresh_schedule_facts(schedules):
+    """
+    Оновити підсумки для пар (дата, id маршруту)
+    Пари групуються за датою, а умови - частинами по SCHEDULE_FACTS_CHUNK дат:
+    довгий ланцюжок OR перевищує граничну глибину виразу SQLite (1000).
+    """
+    routes_by_date = defaultdict(set)
+    for trip_date, route_id in set(schedules):
+        if trip_date and route_id:
+            routes_by_date[trip_date].add(route_id)
+
+    dates = sorted(routes_by_date)
+    with transaction.atomic():
+        for start in range(0, len(dates), SCHEDULE_FACTS_CHUNK):
+            scope = Q()
+            for trip_date in dates[start:start + SCHEDULE_FACTS_CHUNK]:
+                scope |= Q(date=trip_date, route_id__in=sorted(routes_by_date[trip_date]))
+            _rebuild_facts(scope)
+
+
+def refresh_route_facts(route_id):
+    """
+    Оновити всі підсумки маршруту (після зміни пункту прибуття чи марки автобуса)
+    """
+    _rebuild_facts(Q(route_id=route_id))
+
+
+def refresh_trip_facts(trip_ids):
+    """
+    Оновити підсумки для днів і маршрутів вказаних рейсів
+    """
+    refresh_schedule_facts(
+        Trip.objects.filter(pk__in=set(trip_ids)).values_list('date', 'route_id')
+    )
+
+
+# ===== ДАНІ ЗВІТІВ =====
+# Усі звіти обмежені періодом [date_from, date_to] і, за бажанням, пунктом прибуття
+
+def _facts(date_from, date_to, destination=None):
+    facts = ReportDailyFact.objects.filter(date__range=(date_from, date_to))
+    if destination:
+        facts = facts.filter(destination=destination)
+    return facts
+
+
+def popular_destinations(date_from, date_to, destination=None):
+    """Кількість рейсів до кожного пункту прибуття"""
+    return list(
+        _facts(date_from, date_to, destination).values(
+            'destination__name'
+        ).annotate(
+            trip_count=Sum('trips')
+        ).order_by('-trip_count')
+    )
+
+
+def average_bus_occupancy(date_from, date_to, destination=None):
+    """Середня кількість проданих квитків на рейс по кожному маршруту"""
+    rows = _facts(date_from, date_to, destination).values(
+        'route__number',
+        'destination__name',
+        'bus_model__name'
+    ).annotate(
+        total_trips=Sum('trips'),
+        total_sold=Sum('sold'),
+        total_seats=Sum('seats')
+    ).order_by('route__number')
+
+    occupancy_data = []
+    for row in rows:
+        total_trips = row['total_trips']
+        avg_occupancy = row['total_sold'] / total_trips if total_trips > 0 else 0
+        total_seats = row['total_seats']
+        occupancy_percentage = row['total_sold'] / total_seats * 100 if total_seats > 0 else 0
+
+        occupancy_data.append({
+            'route_number': row['route__number'],
+            'destination_name': row['destination__name'],
+            'bus_model_name': row['bus_model__name'],
+            'avg_occupancy': round(avg_occupancy, 1),
+            'total_trips': total_trips,
+            'occupancy_percentage': round(occupancy_percentage, 1)
+        })
+    return occupancy_data
+
+
+def busiest_days(date_from, date_to, destination=None):
+    """Кількість рейсів по днях тижня"""
+    day_names = dict(Route.DAYS_OF_WEEK)
+    days_data = list(
+        _facts(date_from, date_to, destination).values(
+            'weekday'
+        ).annotate(
+            trip_count=Sum('trips')
+        ).order_by('weekday')
+    )
+    for day in days_data:
+        day['day_name'] = day_names.get(day['weekday'], 'Невідомо')
+    return days_data
+
+
+def rarest_trips(date_from, date_to, destination=None, limit=10):
+    """Маршрути з найменшою кількістю рейсів"""
+    return list(
+        _facts(date_from, date_to, destination).values(
+            'route__number',
+            'route__destination__name',
+            'route__days_of_week'
+        ).annotate(
+            trip_count=Sum('trips')
+        ).order_by('trip_count')[:limit]
+    )
+
+
+def revenue_by_destination(date_from, date_to, destination=None):
+    """Виручка та кількість проданих квитків по кожному пункту прибуття"""
+    from .utils import day_start
+
+    # Діапазон по часу продажу, щоб працював частковий індекс проданих квитків
+    tickets = Ticket.objects.filter(
+        status='sold',
+        sold_time__gte=day_start(date_from),
+        sold_time__lt=day_start(date_to + timedelta(days=1))
+    )
+    if destination:
+        tickets = tickets.filter(trip__route__destination=destination)
+
+    return list(
+        tickets.values(
+            'trip__route__destination__name'
+        ).annotate(
+            total_revenue=Sum('price'),
+            tickets_sold=Count('id')
+        ).order_by('-total_revenue')
+    )
@@ -0,0 +1,50 @@
+# bus_station/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import BusModel, FuelPrice, Route, Ticket, Trip
+from .reports import bump_data_version, refresh_route_facts, refresh_schedule_facts, refresh_trip_facts
+from .utils import forget_future_seat_maps, forget_seat_maps, load_fuel_price, rebuild_seat_map
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+def update_trip_state(sender, instance, **kwargs):
+    """Синхронізація карти місць рейсу та підсумків звітів при кожній зміні квитка"""
+    trip_ids = {instance.trip_id, getattr(instance, '_loaded_trip_id', None)} - {None}
+    for trip_id in trip_ids:
+        rebuild_seat_map(trip_id)
+    refresh_trip_facts(trip_ids)
+    instance._loaded_trip_id = instance.trip_id
+
+
+@receiver([post_save, post_delete], sender=Trip)
+def update_trip_facts(sender, instance, **kwargs):
+    """Оновлення підсумків звітів для старої та нової дати/маршруту рейсу"""
+    schedule = (instance.date, instance.route_id)
+    refresh_schedule_facts([schedule, getattr(instance, '_loaded_schedule', schedule)])
+    instance._loaded_schedule = schedule
+    # Автобус рейсу міг змінитися разом з кількістю місць
+    forget_seat_maps([instance.pk])
+
+
+@receiver(post_save, sender=Route)
+def update_route_facts(sender, instance, created, **kwargs):
+    """Перерахунок підсумків маршруту, що вже має рейси"""
+    if not created:
+        refresh_route_facts(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=FuelPrice)
+def refresh_fuel_price_cache(sender, instance, **kwargs):
+    """Запис нової ціни пального у спільний кеш після фіксації транзакції"""
+    transaction.on_commit(load_fuel_price)
+    # Ціни квитків у відповідях API змінились
+    bump_data_version()
+
+
+@receiver(post_save, sender=BusModel)
+def bump_bus_model_version(sender, instance, created, **kwargs):
+    """Витрата пального та кількість місць марки впливають на ціни й вільні місця"""
+    if not created:
+        bump_data_version()
+        forget_future_seat_maps(Trip.objects.filter(bus__bus_model=instance))
@@ -1,3 +1,472 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import count
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from .forms import ReportPeriodForm
+from .management.commands.run_expiry_worker import Command as ExpiryWorkerCommand
+from .models import Bus, BusModel, Destination, FuelPrice, ReportDailyFact, Route, Ticket, Trip
+from .reports import refresh_trip_facts
+from .utils import book_seat, book_seats, cancel_expired_bookings, change_ticket_status, seat_map_cache_key
+from .views import TripListView
+
+ticket_serials = count(1)
+
+
+def create_route(seats_count=10, number='101'):
+    """Маршрут з автобусом потрібної місткості"""
+    bus_model = BusModel.objects.create(name='Богдан', fuel_consumption=Decimal('20'), seats_count=seats_count)
+    bus = Bus.objects.create(bus_model=bus_model, number=f'AA{number}BB')
+    route = Route.objects.create(
+        number=number, tariff=Decimal('100'), days_of_week='1,2,3,4,5,6,7',
+        destination=Destination.objects.create(name='Київ'), distance=Decimal('120'),
+        departure_time=time(8, 0), arrival_time=time(10, 0), bus_model=bus_model
+    )
+    return route, bus
+
+
+def create_trips(route, bus, count, start=None):
+    """count рейсів маршруту на дні поспіль, починаючи з start (за замовчуванням - завтра)"""
+    start = start or date.today() + timedelta(days=1)
+    return Trip.objects.bulk_create(
+        Trip(route=route, bus=bus, date=start + timedelta(days=day), free_seats=bus.bus_model.seats_count)
+        for day in range(count)
+    )
+
+
+def create_ticket(trip, seat_number, status='booked'):
+    """Квиток напряму через ORM, в обхід сервісу бронювання"""
+    return Ticket.objects.create(
+        trip=trip, seat_number=seat_number, status=status,
+        ticket_number=f'T-{next(ticket_serials)}', price=Decimal('100')
+    )
+
+
+def occupied_seats(trip):
+    """Зайняті місця за бітовою картою рейсу з бази"""
+    trip.refresh_from_db()
+    return [seat for seat in range(1, trip.bus.bus_model.seats_count + 1) if not trip.is_seat_free(seat)]
+
+
+class TripStateTests(TestCase):
+    """Лічильники (тригери бази даних) і карта місць після змін квитків"""
+
+    @classmethod
+    def setUpTestData(cls):
+        route, bus = create_route()
+        cls.trip = create_trips(route, bus, 1)[0]
+
+    def assertTripState(self, sold, booked, seats):
+        self.trip.refresh_from_db()
+        self.assertEqual(
+            (self.trip.sold_count, self.trip.booked_count, self.trip.free_seats),
+            (sold, booked, 10 - sold - booked)
+        )
+        self.assertEqual(occupied_seats(self.trip), seats)
+
+    def test_booking(self):
+        for seat_number in (1, 4, 5):
+            create_ticket(self.trip, seat_number)
+        self.assertTripState(sold=0, booked=3, seats=[1, 4, 5])
+
+    def test_sale_and_cancellation(self):
+        sold = create_ticket(self.trip, 1)
+        cancelled = create_ticket(self.trip, 2)
+
+        sold.status = 'sold'
+        sold.save()
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        self.assertTripState(sold=1, booked=0, seats=[1])
+
+        sold.delete()
+        self.assertTripState(sold=0, booked=0, seats=[])
+
+    def test_move_to_another_trip(self):
+        other_trip = Trip.objects.create(
+            route=self.trip.route, bus=self.trip.bus, date=self.trip.date + timedelta(days=1), free_seats=10
+        )
+        ticket = create_ticket(self.trip, 1, status='sold')
+
+        ticket.trip = other_trip
+        ticket.save()
+        self.assertTripState(sold=0, booked=0, seats=[])
+        other_trip.refresh_from_db()
+        self.assertEqual((other_trip.sold_count, other_trip.free_seats), (1, 9))
+
+    def test_expiry(self):
+        expired = create_ticket(self.trip, 1)
+        create_ticket(self.trip, 2)
+        Ticket.objects.filter(pk=expired.pk).update(
+            booking_time=timezone.now() - Ticket.BOOKING_TTL - timedelta(minutes=1)
+        )
+
+        self.assertEqual(cancel_expired_bookings(), [expired.ticket_number])
+        self.assertTripState(sold=0, booked=1, seats=[2])
+
+
+class ReportPeriodFormTests(TestCase):
+    def test_default_period(self):
+        form = ReportPeriodForm({})
+        self.assertTrue(form.is_valid())
+        today = timezone.now().date()
+        self.assertEqual(
+            (form.cleaned_data['date_from'], form.cleaned_data['date_to']),
+            (today - timedelta(days=30), today)
+        )
+
+    def test_only_end_date_keeps_default_span(self):
+        form = ReportPeriodForm({'date_to': '2026-03-31'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['date_from'], date(2026, 3, 1))
+
+    def test_longest_period(self):
+        form = ReportPeriodForm({'date_from': '2025-01-01', 'date_to': '2026-01-02'})
+        self.assertTrue(form.is_valid())
+
+    def test_too_long_period(self):
+        form = ReportPeriodForm({'date_from': '2025-01-01', 'date_to': '2026-01-03'})
+        self.assertFalse(form.is_valid())
+
+    def test_reversed_period(self):
+        form = ReportPeriodForm({'date_from': '2026-02-01', 'date_to': '2026-01-31'})
+        self.assertFalse(form.is_valid())
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Два маршрути з однаковим часом відправлення: порядок рівних дат визначає id
+        start = date.today() + timedelta(days=1)
+        for number in ('101', '102'):
+            route, bus = create_route(number=number)
+            create_trips(route, bus, 12, start=start)
+
+    def get_page(self, cursor=None, page_size=5):
+        view = TripListView()
+        view.setup(RequestFactory().get('/trips/', {'cursor': cursor} if cursor else {}))
+        _, page, trips, _ = view.paginate_queryset(view.get_queryset(), page_size)
+        return page, [trip.pk for trip in trips]
+
+    def test_cursor_round_trip(self):
+        expected = list(Trip.objects.order_by(*TripListView.keyset_ordering).values_list('pk', flat=True))
+
+        # Вперед до останньої сторінки
+        pages = []
+        page, ids = self.get_page()
+        self.assertFalse(page.has_previous)
+        pages.append(ids)
+        while page.has_next:
+            page, ids = self.get_page(page.next_cursor)
+            pages.append(ids)
+        self.assertEqual([pk for ids in pages for pk in ids], expected)
+        self.assertEqual([len(ids) for ids in pages], [5, 5, 5, 5, 4])
+
+        # Назад ті самі сторінки у зворотному порядку
+        for previous_ids in reversed(pages[:-1]):
+            page, ids = self.get_page(page.previous_cursor)
+            self.assertEqual(ids, previous_ids)
+        self.assertFalse(page.has_previous)
+
+    def test_invalid_cursor_returns_first_page(self):
+        _, first_ids = self.get_page()
+        _, ids = self.get_page('not-a-cursor')
+        self.assertEqual(ids, first_ids)
+
+
+class GroupBookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        FuelPrice.objects.create(price=Decimal('55'))
+        route, bus = create_route()
+        cls.trip = create_trips(route, bus, 1)[0]
+
+    def test_book_seats_is_all_or_nothing(self):
+        create_ticket(self.trip, 3)
+
+        with self.assertRaisesMessage(ValidationError, "Місця 3 вже зайняті"):
+            book_seats(self.trip.pk, seat_numbers=[2, 3, 4])
+        self.assertEqual(occupied_seats(self.trip), [3])
+
+    def test_book_seats_rejects_missing_seats(self):
+        with self.assertRaisesMessage(ValidationError, "Місць 0, 11 не існує"):
+            book_seats(self.trip.pk, seat_numbers=[0, 1, 11])
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_book_seats_adjacent(self):
+        create_ticket(self.trip, 2)
+
+        tickets = book_seats(self.trip.pk, count=3)
+        self.assertEqual([ticket.seat_number for ticket in tickets], [3, 4, 5])
+        self.assertEqual(occupied_seats(self.trip), [2, 3, 4, 5])
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.booked_count, self.trip.free_seats), (4, 6))
+
+    def test_book_seats_without_enough_adjacent_seats(self):
+        for seat_number in (3, 6, 9):
+            create_ticket(self.trip, seat_number)
+
+        with self.assertRaises(ValidationError):
+            book_seats(self.trip.pk, count=3)
+        self.assertEqual(Ticket.objects.count(), 3)
+
+
+class ReportFactsTests(TestCase):
+    def test_refresh_trip_facts_for_many_trips(self):
+        # Понад 1000 пар (дата, маршрут) - більше за граничну глибину виразу SQLite
+        route, bus = create_route()
+        trips = create_trips(route, bus, 1200)
+
+        refresh_trip_facts([trip.pk for trip in trips])
+
+        self.assertEqual(ReportDailyFact.objects.count(), 1200)
+        self.assertEqual(ReportDailyFact.objects.filter(trips=1, seats=10).count(), 1200)
+
+
+class AdminQueryCountTests(TestCase):
+    """Кількість запитів сторінок адмінки не залежить від кількості рядків"""
+
+    @classmethod
+    def setUpTestData(cls):
+        route, bus = create_route(seats_count=50)
+        cls.trips = create_trips(route, bus, 1000)
+        tickets = [
+            Ticket(trip=trip, seat_number=1, ticket_number=f'T-{trip.pk}', price=Decimal('100'))
+            for trip in cls.trips
+        ]
+        # Рейс з повним автобусом для сторінки редагування з квитками
+        tickets += [
+            Ticket(trip=cls.trips[0], seat_number=seat, ticket_number=f'T-{cls.trips[0].pk}-{seat}',
+                   price=Decimal('100'))
+            for seat in range(2, 51)
+        ]
+        Ticket.objects.bulk_create(tickets)
+
+    def setUp(self):
+        # Суперкористувач лише в пам'яті: права перевіряються без запитів
+        self.user = User(username='admin', is_active=True, is_staff=True, is_superuser=True)
+        self.factory = RequestFactory()
+
+    def get_admin_page(self, model, object_id=None):
+        model_admin = admin.site._registry[model]
+        request = self.factory.get('/')
+        request.user = self.user
+        with mock.patch.object(model_admin, 'list_per_page', 1000):
+            if object_id is None:
+                response = model_admin.changelist_view(request)
+            else:
+                response = model_admin.change_view(request, str(object_id))
+            response.render()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_trip_changelist(self):
+        with self.assertNumQueries(6):
+            response = self.get_admin_page(Trip)
+        self.assertEqual(response.context_data['cl'].result_count, 1000)
+
+    def test_ticket_changelist(self):
+        with self.assertNumQueries(5):
+            response = self.get_admin_page(Ticket)
+        self.assertEqual(response.context_data['cl'].result_count, 1049)
+
+    def test_trip_change_page(self):
+        with self.assertNumQueries(8):
+            self.get_admin_page(Trip, self.trips[0].pk)
+
+    def test_ticket_change_page(self):
+        with self.assertNumQueries(6):
+            self.get_admin_page(Ticket, Ticket.objects.order_by('-pk').first().pk)
+
+
+class BookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        FuelPrice.objects.create(price=Decimal('55'))
+        route, bus = create_route()
+        cls.trip = create_trips(route, bus, 1)[0]
+
+    def test_book_seat_rejects_taken_seat(self):
+        book_seat(self.trip.pk, 3)
+
+        with self.assertRaisesMessage(ValidationError, "Місце 3 вже зайняте"):
+            book_seat(self.trip.pk, 3)
+        self.assertEqual(Ticket.objects.filter(trip=self.trip).count(), 1)
+
+    def test_book_seat_rejects_missing_seat(self):
+        for seat_number in (0, 11):
+            with self.assertRaises(ValidationError):
+                book_seat(self.trip.pk, seat_number)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_cancelled_seat_can_be_booked_again(self):
+        ticket = book_seat(self.trip.pk, 3)
+        ticket.status = 'cancelled'
+        ticket.save()
+
+        book_seat(self.trip.pk, 3)
+        self.assertEqual(Ticket.objects.filter(trip=self.trip, seat_number=3).count(), 2)
+
+    def test_database_rejects_second_active_ticket(self):
+        # Останній рубіж - частковий унікальний індекс активних місць
+        book_seat(self.trip.pk, 3)
+        with self.assertRaises(IntegrityError):
+            Ticket.objects.create(trip=self.trip, seat_number=3, ticket_number='DUP-1', price=Decimal('1'))
+
+    def test_reactivating_ticket_on_taken_seat(self):
+        ticket = book_seat(self.trip.pk, 3)
+        change_ticket_status(ticket.pk, 'cancelled')
+        book_seat(self.trip.pk, 3)
+
+        with self.assertRaisesMessage(ValidationError, "Місце 3 вже зайняте"):
+            change_ticket_status(ticket.pk, 'booked')
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, 'cancelled')
+
+    def test_update_view_reports_seat_taken_after_validation(self):
+        ticket = book_seat(self.trip.pk, 3)
+        change_ticket_status(ticket.pk, 'cancelled')
+        book_seat(self.trip.pk, 3)
+
+        # Місце зайняли між перевіркою форми і збереженням
+        with mock.patch.object(Ticket, 'clean'), mock.patch.object(Ticket, 'validate_constraints'):
+            response = self.client.post(reverse('ticket_update', args=[ticket.pk]), {'status': 'booked'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'status', "Місце 3 вже зайняте")
+
+
+class GenerateTripsTests(TestCase):
+    def generate_trips(self, days):
+        out = StringIO()
+        call_command('generate_trips', '--from', '2026-03-02', '--days', str(days), stdout=out)
+        return out.getvalue()
+
+    def test_counts_only_inserted_trips(self):
+        route, bus = create_route()
+        self.assertIn("створено 3 рейсів", self.generate_trips(3))
+        self.assertIn("створено 2 рейсів", self.generate_trips(5))
+        self.assertEqual(Trip.objects.filter(route=route).count(), 5)
+
+    def test_skips_trips_created_concurrently(self):
+        route, bus = create_route()
+        runs_on = Route.runs_on
+
+        def concurrent_runs_on(route_obj, weekday):
+            # Інший процес встигає створити один з рейсів, поки команда перебирає маршрути
+            if not Trip.objects.exists():
+                Trip.objects.create(route=route, bus=bus, date=date(2026, 3, 3))
+            return runs_on(route_obj, weekday)
+
+        with mock.patch.object(Route, 'runs_on', concurrent_runs_on):
+            output = self.generate_trips(3)
+        self.assertIn("Пропущено 1 рейсів", output)
+        self.assertIn("створено 2 рейсів", output)
+        self.assertEqual(Trip.objects.filter(route=route).count(), 3)
+
+
+class ExpiryWorkerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        route, bus = create_route()
+        cls.trip = create_trips(route, bus, 1)[0]
+
+    def create_worker(self):
+        worker = ExpiryWorkerCommand(stdout=StringIO(), stderr=StringIO())
+        worker.deadlines, worker.queued = [], set()
+        worker.poll_overlap = timedelta(seconds=60)
+        return worker
+
+    def test_poll_picks_up_booking_committed_late(self):
+        worker = self.create_worker()
+        worker.load_bookings(resync=True)
+        Ticket.objects.create(pk=100, trip=self.trip, seat_number=1, ticket_number='T-100', price=Decimal('100'))
+        worker.load_bookings()
+
+        # Менший id і час бронювання до попереднього опитування: транзакцію
+        # зафіксовано вже після нього
+        late = Ticket.objects.create(pk=50, trip=self.trip, seat_number=2, ticket_number='T-50', price=Decimal('100'))
+        Ticket.objects.filter(pk=late.pk).update(booking_time=worker.polled_at - timedelta(seconds=5))
+        worker.load_bookings()
+
+        self.assertEqual(worker.queued, {50, 100})
+        self.assertEqual(len(worker.deadlines), 2)
+
+    def test_survives_database_errors(self):
+        calls = []
+
+        def load_bookings(worker, resync=False):
+            calls.append(resync)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            worker.running = False
+
+        with mock.patch.object(ExpiryWorkerCommand, 'load_bookings', load_bookings), \
+                mock.patch('time.sleep') as sleep, \
+                self.assertLogs('bus_station.management.commands.run_expiry_worker', 'ERROR') as logs:
+            call_command('run_expiry_worker', stdout=StringIO(), stderr=StringIO())
+
+        # Після помилки - пауза і повна звірка черги з базою
+        self.assertEqual(calls, [True, True])
+        self.assertEqual(sleep.call_args_list[0], mock.call(1))
+        self.assertIn("database is locked", logs.output[0])
+
+
+class SeatMapETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        route, bus = create_route()
+        cls.trip = create_trips(route, bus, 1)[0]
+
+    def setUp(self):
+        self.url = reverse('get_available_seats', args=[self.trip.pk])
+
+    def get_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_etag_changes_only_with_seat_map(self):
+        etag = self.get_etag()
+
+        # Карта перечитана з бази після TTL - ETag той самий
+        cache.delete(seat_map_cache_key(self.trip.pk))
+        self.assertEqual(self.get_etag(), etag)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_ticket(self.trip, 1)
+        self.assertNotEqual(self.get_etag(), etag)
+
+
+class TripSearchConditionalTests(TestCase):
+    def request_at(self, moment, **kwargs):
+        # Версія даних - реальний час запису, тому "зараз" береться після неї
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            return self.client.get(reverse('api_trip_search'), **kwargs)
+
+    def test_implicit_date_is_part_of_validators(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        before_midnight = timezone.make_aware(datetime.combine(tomorrow, time(23, 59)))
+        after_midnight = before_midnight + timedelta(minutes=2)
+
+        response = self.request_at(before_midnight)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        # Явна та сама дата дає той самий ETag
+        self.assertEqual(self.request_at(before_midnight, data={'date': tomorrow.isoformat()})['ETag'], etag)
+        self.assertEqual(self.request_at(before_midnight, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Після півночі "сьогодні" - вже інший день: повна відповідь замість 304
+        self.assertEqual(self.request_at(after_midnight, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.request_at(after_midnight, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
@@ -11,12 +11,17 @@ urlpatterns = [
     # Квитки
     path('tickets/', views.TicketListView.as_view(), name='ticket_list'),
     path('tickets/create/', views.TicketCreateView.as_view(), name='ticket_create'),
+    path('tickets/create-group/', views.GroupBookingView.as_view(), name='ticket_group_create'),
     path('tickets/<int:pk>/', views.TicketDetailView.as_view(), name='ticket_detail'),
     path('tickets/<int:pk>/update/', views.TicketUpdateView.as_view(), name='ticket_update'),
     path('tickets/<int:ticket_id>/confirm/', views.ConfirmBookingView.as_view(), name='confirm_booking'),
     path('tickets/<int:ticket_id>/cancel/', views.CancelBookingView.as_view(), name='cancel_booking'),
     path('tickets/get-available-seats/<int:trip_id>/', views.GetAvailableSeatsView.as_view(),
          name='get_available_seats'),
+    path('tickets/seat-events/<int:trip_id>/', views.trip_seat_events, name='trip_seat_events'),
+
+    # API
+    path('api/trips/', views.TripSearchApiView.as_view(), name='api_trip_search'),
 
     # Рейси
     path('trips/', views.TripListView.as_view(), name='trip_list'),
@@ -1,21 +1,86 @@
 # bus_station/utils.py
+from collections import Counter
+from datetime import datetime, timedelta
+import hashlib
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, ExtractIsoWeekDay
 from django.utils import timezone
 from decimal import Decimal
-from .models import FuelPrice, Trip, Ticket
+from .models import FuelPrice, Route, Trip, Ticket, TicketNumberSequence, pack_seat_map
+from .reports import aget_data_version, bump_data_version, get_data_version, refresh_trip_facts
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Кеш поточної ціни пального: спільний кеш Django + коротка пам'ять процесу
+FUEL_PRICE_CACHE_KEY = 'bus_station:fuel_price'
+FUEL_PRICE_LOCAL_TTL = getattr(settings, 'FUEL_PRICE_LOCAL_CACHE_TTL', 5)  # секунд
+# Обмежений TTL: навіть при локальному для процесу кеші нова ціна дійде до всіх воркерів
+FUEL_PRICE_CACHE_TTL = getattr(settings, 'FUEL_PRICE_CACHE_TTL', 300)  # секунд
+
+_fuel_price_memo = {'value': None, 'expires': 0.0}
+fuel_price_cache_stats = Counter()
+
+
 def get_current_fuel_price():
     """
     Отримати поточну ціну пального
+    Значення береться з пам'яті процесу, потім зі спільного кешу,
+    і лише при промаху обох - з бази даних
     """
-    try:
-        return FuelPrice.objects.latest('date_updated')
-    except FuelPrice.DoesNotExist:
+    now = time.monotonic()
+    if _fuel_price_memo['expires'] > now:
+        fuel_price_cache_stats['local_hits'] += 1
+        fuel_price = _fuel_price_memo['value']
+    else:
+        fuel_price = cache.get(FUEL_PRICE_CACHE_KEY)
+        if fuel_price is None:
+            fuel_price_cache_stats['misses'] += 1
+            fuel_price = load_fuel_price()
+        else:
+            fuel_price_cache_stats['hits'] += 1
+        _fuel_price_memo.update(value=fuel_price, expires=now + FUEL_PRICE_LOCAL_TTL)
+
+    if not fuel_price:
         logger.error("Ціна пального не встановлена")
         return None
+    return fuel_price
+
+
+def load_fuel_price():
+    """
+    Прочитати ціну пального з бази та записати її у спільний кеш
+    Відсутність ціни кешується як False
+    """
+    try:
+        fuel_price = FuelPrice.objects.latest('date_updated')
+    except FuelPrice.DoesNotExist:
+        fuel_price = False
+    cache.set(FUEL_PRICE_CACHE_KEY, fuel_price, FUEL_PRICE_CACHE_TTL)
+    reset_local_fuel_price()
+    return fuel_price
+
+
+def reset_local_fuel_price():
+    _fuel_price_memo.update(value=None, expires=0.0)
+
+
+def get_fuel_price_cache_stats():
+    """Статистика звернень до кешу ціни пального"""
+    return {
+        'hits': fuel_price_cache_stats['hits'],
+        'local_hits': fuel_price_cache_stats['local_hits'],
+        'misses': fuel_price_cache_stats['misses'],
+    }
 
 
 def calculate_base_price(route, fuel_price_obj):
@@ -60,69 +125,348 @@ def calculate_occupancy_discount(sold_tickets_count):
     return Decimal('0')
 
 
+def calculate_ticket_prices(trips, sold_counts=None):
+    """
+    Розрахунок фінальних цін квитків для багатьох рейсів одразу
+    Ціна пального читається один раз, кількість проданих квитків береться
+    з лічильника рейсу, якщо її не передано в sold_counts.
+    Повертає словник {id рейсу: ціна}
+    """
+    if isinstance(trips, QuerySet):
+        trips = trips.select_related('route__bus_model')
+    trips = list(trips)
+
+    sold_counts = sold_counts or {}
+
+    fuel_price = get_current_fuel_price()
+
+    prices = {}
+    for trip in trips:
+        route = trip.route
+        base_price = calculate_base_price(route, fuel_price)
+
+        # Сумарна знижка
+        total_discount = (
+            calculate_distance_discount(route.distance) +
+            calculate_occupancy_discount(sold_counts.get(trip.pk, trip.sold_count))
+        )
+
+        # Застосовуємо знижку, ціна не може бути від'ємною
+        prices[trip.pk] = max(base_price * (Decimal('1') - total_discount), Decimal('0'))
+
+    return prices
+
+
 def calculate_final_ticket_price(trip, sold_tickets_count=None):
     """
     Розрахунок фінальної ціни квитка з урахуванням всіх знижок
     """
-    if sold_tickets_count is None:
-        sold_tickets_count = trip.get_sold_tickets_count()
+    sold_counts = None if sold_tickets_count is None else {trip.pk: sold_tickets_count}
+    return calculate_ticket_prices([trip], sold_counts)[trip.pk]
+
+
+# Номери квитків: глобальний лічильник у базі, який процеси забирають блоками
+TICKET_NUMBER_SEQUENCE = 'ticket'
+TICKET_NUMBER_BLOCK_SIZE = getattr(settings, 'TICKET_NUMBER_BLOCK_SIZE', 100)
+
+_ticket_number_block = {'next': 0, 'end': 0}
+_ticket_number_lock = threading.Lock()
 
-    fuel_price = get_current_fuel_price()
-    base_price = calculate_base_price(trip.route, fuel_price)
 
-    # Розраховуємо знижки
-    distance_discount = calculate_distance_discount(trip.route.distance)
-    occupancy_discount = calculate_occupancy_discount(sold_tickets_count)
+def _reset_ticket_number_block():
+    """Дочірній процес не може продовжувати блок батьківського"""
+    _ticket_number_block.update(next=0, end=0)
 
-    # Сумарна знижка
-    total_discount = distance_discount + occupancy_discount
 
-    # Застосовуємо знижку
-    final_price = base_price * (Decimal('1') - total_discount)
+os.register_at_fork(after_in_child=_reset_ticket_number_block)
 
-    # Ціна не може бути від'ємною
-    return max(final_price, Decimal('0'))
+
+def allocate_ticket_number_block(size):
+    """
+    Зарезервувати в лічильнику size номерів поспіль, повертає перший з них
+    Поза транзакцією рядок лічильника блокується лише на цей короткий UPDATE.
+    Усередині зовнішньої транзакції блокування триває до її фіксації, і всі
+    інші бронювання чекають на цей єдиний рядок - тому номери слід брати
+    до відкриття транзакції, як це роблять book_seat і book_seats.
+    """
+    with transaction.atomic():
+        sequence, _ = TicketNumberSequence.objects.select_for_update().get_or_create(
+            name=TICKET_NUMBER_SEQUENCE
+        )
+        TicketNumberSequence.objects.filter(pk=sequence.pk).update(last_value=F('last_value') + size)
+    return sequence.last_value + 1
+
+
+def next_ticket_serials(count=1):
+    """
+    Наступні count порядкових номерів квитків
+    Поза транзакцією номери видаються з блоку процесу, і до бази звертаємося
+    лише раз на TICKET_NUMBER_BLOCK_SIZE квитків. Усередині транзакції блок не кешується:
+    після її відкату ті самі номери отримав би інший процес. Цей шлях навмисно
+    повільний: лічильник лишається заблокованим до фіксації зовнішньої транзакції
+    і послідовно пропускає всіх, хто бронює (див. allocate_ticket_number_block).
+    """
+    if not transaction.get_autocommit():
+        first = allocate_ticket_number_block(count)
+        return list(range(first, first + count))
+
+    serials = []
+    with _ticket_number_lock:
+        while len(serials) < count:
+            if _ticket_number_block['next'] >= _ticket_number_block['end']:
+                size = max(TICKET_NUMBER_BLOCK_SIZE, count - len(serials))
+                first = allocate_ticket_number_block(size)
+                _ticket_number_block.update(next=first, end=first + size)
+            take = min(count - len(serials), _ticket_number_block['end'] - _ticket_number_block['next'])
+            serials.extend(range(_ticket_number_block['next'], _ticket_number_block['next'] + take))
+            _ticket_number_block['next'] += take
+    return serials
+
+
+def format_ticket_number(trip, serial):
+    """
+    Номер квитка у форматі РЕЙС-ДДММРР-ПОРЯДКОВИЙ_НОМЕР
+    Унікальність дає порядковий номер, рейс і дата - для зручності касира
+    """
+    return f"{trip.route.number}-{trip.date.strftime('%d%m%y')}-{serial:08d}"
 
 
 def generate_ticket_number(trip):
     """
     Генерація унікального номера квитка
-    Формат: РЕЙС_ДАТА_ЧАС
     """
-    timestamp = timezone.now().strftime("%H%M%S")
-    return f"{trip.route.number}_{trip.date.strftime('%d%m%Y')}_{timestamp}"
+    return format_ticket_number(trip, next_ticket_serials()[0])
+
+
+def generate_ticket_numbers(trip, count):
+    """
+    Номери для кількох квитків одного бронювання
+    """
+    return [format_ticket_number(trip, serial) for serial in next_ticket_serials(count)]
 
 
 def get_available_seats(trip):
     """
     Отримати список вільних місць для рейсу
+    Місця визначаються за бітовою картою рейсу без запиту до квитків
     """
-    total_seats = trip.bus.bus_model.seats_count
+    return trip.get_available_seats()
+
 
-    # Місця, які вже зайняті (продані або заброньовані)
-    occupied_seats = Ticket.objects.filter(
-        trip=trip
-    ).exclude(
-        status='cancelled'
-    ).values_list('seat_number', flat=True)
+def is_seat_available(trip, seat_number):
+    """
+    Перевірити, чи вільне місце
+    """
+    return trip.is_seat_free(seat_number)
 
-    # Всі можливі місця
-    all_seats = list(range(1, total_seats + 1))
 
-    # Вільні місця
-    available_seats = [seat for seat in all_seats if seat not in occupied_seats]
+def rebuild_seat_map(trip_id):
+    """
+    Перерахувати карту зайнятих місць рейсу за його квитками
+    """
+    with transaction.atomic():
+        # Блокуємо рядок рейсу, щоб паралельні оновлення не перезаписали карту
+        seats_count = Trip.objects.select_for_update(of=('self',)).filter(
+            pk=trip_id
+        ).values_list('bus__bus_model__seats_count', flat=True).first()
+        if seats_count is None:
+            return
+        occupied_seats = Ticket.objects.filter(
+            trip_id=trip_id
+        ).exclude(
+            status='cancelled'
+        ).values_list('seat_number', flat=True)
+        seat_map = pack_seat_map(occupied_seats)
+        Trip.objects.filter(pk=trip_id).update(seat_map=seat_map)
+        publish_seat_maps({trip_id: (seat_map, seats_count)})
+
+
+def rebuild_seat_maps(trips=None, publish=True):
+    """
+    Перерахувати карти місць для набору рейсів (за замовчуванням - усіх)
+    Рейси блокуються за зростанням id (як у book_seat), щоб паралельне
+    бронювання не зафіксувалось між читанням квитків і записом карт.
+    publish=False - лише записати карти в базу, не оновлюючи кеш.
+    Повертає кількість оброблених рейсів
+    """
+    trips = Trip.objects.all() if trips is None else trips
+    with transaction.atomic():
+        seats_counts = dict(
+            Trip.objects.select_for_update(of=('self',)).filter(
+                pk__in=trips.values('pk')
+            ).order_by('pk').values_list('pk', 'bus__bus_model__seats_count')
+        )
+        masks = dict.fromkeys(seats_counts, 0)
+
+        occupied_seats = Ticket.objects.filter(
+            trip_id__in=trips.values('pk')
+        ).exclude(
+            status='cancelled'
+        ).values_list('trip_id', 'seat_number')
+        for trip_id, seat_number in occupied_seats.iterator(chunk_size=5000):
+            masks[trip_id] |= 1 << (seat_number - 1)
+
+        seat_maps = {
+            trip_id: mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+            for trip_id, mask in masks.items()
+        }
+        Trip.objects.bulk_update(
+            [Trip(pk=trip_id, seat_map=seat_map) for trip_id, seat_map in seat_maps.items()],
+            ['seat_map'],
+            batch_size=500
+        )
+        if publish:
+            publish_seat_maps({
+                trip_id: (seat_map, seats_counts[trip_id])
+                for trip_id, seat_map in seat_maps.items()
+            })
+    return len(masks)
 
-    return available_seats
 
+# ===== КАРТИ МІСЦЬ У КЕШІ =====
+# Актуальна карта місць кожного рейсу з версією для ETag та SSE
+# Короткий TTL: після нього карта перечитується з бази, тому навіть карта,
+# опублікована в іншому процесі повз локальний кеш, застаріває ненадовго
 
-def is_seat_available(trip, seat_number):
+SEAT_MAP_CACHE_TTL = getattr(settings, 'SEAT_MAP_CACHE_TTL', 30)  # секунд
+
+
+def seat_map_cache_key(trip_id):
+    return f"trip_seats:{trip_id}"
+
+
+def seat_map_state(seat_map, seats_count):
     """
-    Перевірити, чи вільне місце
+    Стан карти місць для кешу з версією, обчисленою за її вмістом
+    Версія змінюється лише зі зміною карти, тому перечитування з бази
+    після TTL не змінює ETag і не шле SSE-подій
     """
-    return not Ticket.objects.filter(
-        trip=trip,
-        seat_number=seat_number
-    ).exclude(status='cancelled').exists()
+    # Нулі в кінці карти не означають зайнятих місць
+    seat_map = bytes(seat_map or b'').rstrip(b'\0')
+    digest = hashlib.blake2b(f'{seats_count}:'.encode() + seat_map, digest_size=8)
+    return {
+        'version': digest.hexdigest(),
+        'seat_map': seat_map,
+        'seats_count': seats_count
+    }
+
+
+def publish_seat_maps(seat_maps):
+    """
+    Записати нові карти місць {id рейсу: (карта, кількість місць)} у кеш
+    після фіксації транзакції
+    """
+    def publish():
+        cache.set_many({
+            seat_map_cache_key(trip_id): seat_map_state(seat_map, seats_count)
+            for trip_id, (seat_map, seats_count) in seat_maps.items()
+        }, SEAT_MAP_CACHE_TTL)
+
+    if seat_maps:
+        transaction.on_commit(publish)
+
+
+def forget_seat_maps(trip_ids):
+    """Прибрати карти рейсів з кешу (напр., після зміни автобуса)"""
+    keys = [seat_map_cache_key(trip_id) for trip_id in trip_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_future_seat_maps(trips):
+    """
+    Прибрати з кешу карти лише сьогоднішніх і майбутніх рейсів набору
+    Карти минулих рейсів ніхто не бронює, вони застаріють за SEAT_MAP_CACHE_TTL
+    """
+    forget_seat_maps(trips.filter(date__gte=timezone.now().date()).values_list('pk', flat=True))
+
+
+def get_seat_map_state(trip_id):
+    """
+    Карта місць рейсу з версією: з кешу, а при промаху - одним запитом до бази
+    Повертає None, якщо рейсу не існує
+    """
+    state = cache.get(seat_map_cache_key(trip_id))
+    if state is not None:
+        return state
+
+    row = Trip.objects.filter(pk=trip_id).values_list(
+        'seat_map', 'bus__bus_model__seats_count'
+    ).first()
+    if row is None:
+        return None
+    state = seat_map_state(*row)
+    # Не перезаписуємо свіжішу карту, опубліковану паралельно
+    cache.add(seat_map_cache_key(trip_id), state, SEAT_MAP_CACHE_TTL)
+    return cache.get(seat_map_cache_key(trip_id), state)
+
+
+async def aget_seat_map_state(trip_id):
+    """Асинхронний варіант get_seat_map_state для ASGI-views"""
+    state = await cache.aget(seat_map_cache_key(trip_id))
+    if state is not None:
+        return state
+
+    row = await Trip.objects.filter(pk=trip_id).values_list(
+        'seat_map', 'bus__bus_model__seats_count'
+    ).afirst()
+    if row is None:
+        return None
+    state = seat_map_state(*row)
+    await cache.aadd(seat_map_cache_key(trip_id), state, SEAT_MAP_CACHE_TTL)
+    return await cache.aget(seat_map_cache_key(trip_id), state)
+
+
+def seat_map_free_seats(state):
+    """Вільні місця за станом карти з кешу"""
+    mask = int.from_bytes(state['seat_map'], 'little')
+    return [seat for seat in range(1, state['seats_count'] + 1) if not (mask >> (seat - 1)) & 1]
+
+
+def seat_map_delta(old_state, new_state):
+    """Місця, що стали зайнятими та звільнилися між двома станами карти"""
+    old_mask = int.from_bytes(old_state['seat_map'], 'little')
+    new_mask = int.from_bytes(new_state['seat_map'], 'little')
+    seats_count = max(old_state['seats_count'], new_state['seats_count'])
+    occupied = [
+        seat for seat in range(1, seats_count + 1)
+        if (new_mask >> (seat - 1)) & 1 and not (old_mask >> (seat - 1)) & 1
+    ]
+    freed = [
+        seat for seat in range(1, seats_count + 1)
+        if (old_mask >> (seat - 1)) & 1 and not (new_mask >> (seat - 1)) & 1
+    ]
+    return occupied, freed
+
+
+def recount_trip_counters(trips=None):
+    """
+    Перерахувати лічильники sold_count/booked_count/free_seats за квитками
+    Зазвичай їх підтримують тригери бази даних; функція для відновлення.
+    Повертає кількість оновлених рейсів
+    """
+    trips = Trip.objects.all() if trips is None else trips
+
+    def tickets_count(status):
+        return Coalesce(Subquery(
+            Ticket.objects.filter(
+                trip=OuterRef('pk'),
+                status=status
+            ).values('trip').annotate(
+                count=Count('id')
+            ).values('count')
+        ), 0)
+
+    seats_count = Subquery(
+        Trip.objects.filter(pk=OuterRef('pk')).values('bus__bus_model__seats_count')
+    )
+    updated_count = trips.update(
+        sold_count=tickets_count('sold'),
+        booked_count=tickets_count('booked'),
+        free_seats=seats_count - tickets_count('sold') - tickets_count('booked')
+    )
+    bump_data_version()
+    return updated_count
 
 
 def get_trip_occupancy_percentage(trip):
@@ -138,24 +482,80 @@ def get_trip_occupancy_percentage(trip):
     return (sold_count / total_seats) * 100
 
 
-def cancel_expired_bookings():
+def cancel_expired_bookings(queryset=None, batch_size=1000):
     """
     Скасувати всі прострочені бронювання
-    Повертає кількість скасованих бронювань
+    Квитки оновлюються пачками за зростанням первинного ключа одним UPDATE
+    на пачку, тому блокування тримаються недовго.
+    Повертає список номерів скасованих квитків
     """
-    expired_bookings = Ticket.objects.filter(
-        status='booked'
+    cutoff = timezone.now() - Ticket.BOOKING_TTL
+    expired_bookings = (Ticket.objects.all() if queryset is None else queryset).filter(
+        status='booked',
+        booking_time__lte=cutoff
     )
 
-    cancelled_count = 0
-    for booking in expired_bookings:
-        if booking.is_booking_expired():
-            booking.status = 'cancelled'
-            booking.save()
-            cancelled_count += 1
-            logger.info(f"Скасовано прострочене бронювання {booking.ticket_number}")
+    cancelled_numbers = []
+    last_pk = 0
+    while True:
+        batch = cancel_booked_tickets(
+            expired_bookings.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        cancelled_numbers.extend(ticket_number for _, ticket_number in batch)
+
+    for ticket_number in cancelled_numbers:
+        logger.info(f"Скасовано прострочене бронювання {ticket_number}")
+
+    return cancelled_numbers
+
+
+def cancel_booked_tickets(tickets):
+    """
+    Скасувати одну пачку заброньованих квитків одним UPDATE
+    Лічильники рейсів оновлюють тригери, карти місць і підсумки звітів
+    перераховуються тут.
+    Повертає список пар (id, номер квитка) скасованих квитків
+    """
+    with transaction.atomic():
+        batch = list(
+            tickets.select_for_update(of=('self',)).values_list('pk', 'ticket_number', 'trip_id')
+        )
+        if not batch:
+            return []
+
+        Ticket.objects.filter(
+            pk__in=[pk for pk, _, _ in batch],
+            status='booked'
+        ).update(status='cancelled')
+
+        trip_ids = {trip_id for _, _, trip_id in batch}
+        rebuild_seat_maps(Trip.objects.filter(pk__in=trip_ids))
+        refresh_trip_facts(trip_ids)
+
+    return [(pk, ticket_number) for pk, ticket_number, _ in batch]
 
-    return cancelled_count
+
+def get_routes_for_weekday(weekday):
+    """
+    Маршрути, що виходять у вказаний день тижня (1 - Понеділок, 7 - Неділя)
+    """
+    return Route.objects.filter(days_mask__in=Route.masks_for_weekday(weekday))
+
+
+def get_trips_off_schedule():
+    """
+    Рейси, дата яких не збігається з днями тижня їхнього маршруту
+    """
+    # EXTRACT у PostgreSQL повертає numeric, тому приводимо день до цілого
+    weekday = Cast(ExtractIsoWeekDay('date'), IntegerField())
+    return Trip.objects.alias(
+        weekday_bit=Value(1, output_field=IntegerField()).bitleftshift(weekday - 1)
+    ).alias(
+        scheduled=F('route__days_mask').bitand(F('weekday_bit'))
+    ).filter(scheduled=0)
 
 
 def get_trips_for_tomorrow():
@@ -179,6 +579,149 @@ def validate_seat_number(trip, seat_number):
     return True, "Місце доступне"
 
 
+def book_seat(trip_id, seat_number):
+    """
+    Забронювати місце на рейсі
+    Рейс блокується на час транзакції, тому паралельні бронювання
+    одного рейсу виконуються по черзі; унікальний індекс активних місць
+    гарантує відсутність подвійного продажу навіть без блокування.
+    Якщо місце недоступне - ValidationError
+    """
+    # Номер береться до блокування рейсу: звернення до лічильника не подовжує транзакцію
+    serial = next_ticket_serials()[0]
+
+    with transaction.atomic():
+        trip = Trip.objects.select_for_update(of=('self',)).select_related(
+            'route__bus_model',
+            'bus__bus_model'
+        ).get(pk=trip_id)
+
+        is_valid, error_message = validate_seat_number(trip, seat_number)
+        if not is_valid:
+            raise ValidationError(error_message)
+
+        ticket = Ticket(
+            trip=trip,
+            seat_number=seat_number,
+            status='booked',
+            ticket_number=format_ticket_number(trip, serial),
+            price=calculate_final_ticket_price(trip),
+        )
+        try:
+            with transaction.atomic():
+                ticket.save()
+        except IntegrityError:
+            seat_taken = Ticket.objects.filter(
+                trip=trip,
+                seat_number=seat_number
+            ).exclude(status='cancelled').exists()
+            if seat_taken:
+                raise ValidationError(f"Місце {seat_number} вже зайняте")
+            raise
+
+    return ticket
+
+
+def book_seats(trip_id, seat_numbers=None, count=None):
+    """
+    Забронювати кілька місць на рейсі однією транзакцією
+    Або конкретні місця seat_numbers, або перші count вільних місць поспіль.
+    Рейс блокується один раз, місця перевіряються за його картою, ціна
+    рахується один раз, квитки вставляються одним bulk_create. Якщо хоч одне
+    місце недоступне - ValidationError і жодного квитка не створено.
+    """
+    serials = next_ticket_serials(count if seat_numbers is None else len(set(seat_numbers)))
+
+    with transaction.atomic():
+        trip = Trip.objects.select_for_update(of=('self',)).select_related(
+            'route__bus_model',
+            'bus__bus_model'
+        ).get(pk=trip_id)
+
+        if seat_numbers is None:
+            seat_numbers = trip.get_adjacent_free_seats(count)
+            if seat_numbers is None:
+                raise ValidationError(f"На рейсі немає {count} вільних місць поспіль")
+        else:
+            seat_numbers = sorted(set(seat_numbers))
+            seats_count = trip.bus.bus_model.seats_count
+            invalid_seats = [seat for seat in seat_numbers if seat < 1 or seat > seats_count]
+            if invalid_seats:
+                raise ValidationError(
+                    f"Місць {', '.join(map(str, invalid_seats))} не існує. Максимальний номер: {seats_count}"
+                )
+            # Карта місць заблокованого рейсу актуальна: її оновлює лише той, хто тримає блокування
+            taken_seats = [seat for seat in seat_numbers if not trip.is_seat_free(seat)]
+            if taken_seats:
+                raise ValidationError(f"Місця {', '.join(map(str, taken_seats))} вже зайняті")
+
+        price = calculate_final_ticket_price(trip)
+        tickets = [
+            Ticket(
+                trip=trip,
+                seat_number=seat_number,
+                status='booked',
+                ticket_number=format_ticket_number(trip, serial),
+                price=price,
+            )
+            for seat_number, serial in zip(seat_numbers, serials)
+        ]
+        try:
+            with transaction.atomic():
+                Ticket.objects.bulk_create(tickets)
+        except IntegrityError:
+            taken_seats = list(Ticket.objects.filter(
+                trip=trip,
+                seat_number__in=seat_numbers
+            ).exclude(status='cancelled').values_list('seat_number', flat=True))
+            if taken_seats:
+                raise ValidationError(f"Місця {', '.join(map(str, sorted(taken_seats)))} вже зайняті")
+            raise
+
+        # bulk_create не надсилає сигналів: лічильники оновили тригери,
+        # карту місць і підсумки звітів оновлюємо один раз на всю групу
+        rebuild_seat_map(trip.pk)
+        refresh_trip_facts([trip.pk])
+
+    return tickets
+
+
+def change_ticket_status(ticket_id, status):
+    """
+    Змінити статус квитка
+    Рейс блокується, як у book_seat, тому повернення скасованого квитка
+    в активні перевіряється за актуальною картою місць. Якщо місце тим
+    часом зайняв інший квиток - ValidationError
+    """
+    with transaction.atomic():
+        trip_id = Ticket.objects.values_list('trip_id', flat=True).get(pk=ticket_id)
+        trip = Trip.objects.select_for_update(of=('self',)).get(pk=trip_id)
+        ticket = Ticket.objects.select_for_update().get(pk=ticket_id)
+
+        if ticket.status == 'cancelled' and status != 'cancelled' and not trip.is_seat_free(ticket.seat_number):
+            raise ValidationError(f"Місце {ticket.seat_number} вже зайняте")
+
+        ticket.status = status
+        try:
+            with transaction.atomic():
+                ticket.save()
+        except IntegrityError:
+            raise ValidationError(f"Місце {ticket.seat_number} вже зайняте")
+
+    return ticket
+
+
+def filter_tickets(queryset, status=None, trip_date=None):
+    """
+    Фільтри списку квитків (спільні для сторінки та експорту)
+    """
+    if status:
+        queryset = queryset.filter(status=status)
+    if trip_date:
+        queryset = queryset.filter(trip__date=trip_date)
+    return queryset
+
+
 def get_ticket_history(ticket_number):
     """
     Отримати повну історію квитка
@@ -222,9 +765,48 @@ def get_today_trips():
     today = timezone.now().date()
     return Trip.objects.filter(date=today).select_related('route__destination', 'bus__bus_model')
 
+STATION_STATS_AGGREGATES = {
+    'trips': Count('id'),
+    'tickets': Coalesce(Sum('sold_count'), 0),
+}
+
+
+def get_station_stats(day=None):
+    """
+    Кількість рейсів і проданих квитків за день (за замовчуванням - сьогодні)
+    Рахується за лічильниками рейсів без з'єднання з квитками і кешується
+    до наступної зміни даних, але не довше STATION_STATS_CACHE_TTL секунд
+    """
+    day = day or timezone.now().date()
+    cache_key = f"station_stats:{day.isoformat()}:{get_data_version()}"
+    stats = cache.get(cache_key)
+    if stats is None:
+        stats = Trip.objects.filter(date=day).aggregate(**STATION_STATS_AGGREGATES)
+        cache.set(cache_key, stats, getattr(settings, 'STATION_STATS_CACHE_TTL', 60))
+    return stats
+
+
+async def aget_station_stats(day=None):
+    """Асинхронний варіант get_station_stats (той самий ключ кешу)"""
+    day = day or timezone.now().date()
+    cache_key = f"station_stats:{day.isoformat()}:{await aget_data_version()}"
+    stats = await cache.aget(cache_key)
+    if stats is None:
+        stats = await Trip.objects.filter(date=day).aaggregate(**STATION_STATS_AGGREGATES)
+        await cache.aset(cache_key, stats, getattr(settings, 'STATION_STATS_CACHE_TTL', 60))
+    return stats
+
+
 def get_revenue_for_period(start_date, end_date):
     """Отримати виручку за період"""
+    # Діапазон по самому полю (а не по його даті), щоб працював індекс
     return Ticket.objects.filter(
         status='sold',
-        sold_time__date__range=[start_date, end_date]
-    ).aggregate(total_revenue=Sum('price'))['total_revenue'] or 0
\ No newline at end of file
+        sold_time__gte=day_start(start_date),
+        sold_time__lt=day_start(end_date + timedelta(days=1))
+    ).aggregate(total_revenue=Sum('price'))['total_revenue'] or 0
+
+
+def day_start(day):
+    """Початок дня в поточному часовому поясі"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
\ No newline at end of file
@@ -1,44 +1,66 @@
 # bus_station/views.py
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views import View
-from django.views.generic import ListView, CreateView, UpdateView, DetailView
-from django.urls import reverse_lazy
+from django.views.generic import ListView, UpdateView, DetailView, FormView
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.http import JsonResponse
-from django.db.models import Count, Sum, Avg, Q
-from datetime import timedelta
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.template.response import TemplateResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import condition
+from datetime import datetime, timezone as dt_timezone
+import asyncio
+import hashlib
+import json
+import logging
+from . import reports
+from .exports import TICKET_EXPORT_HEADER, csv_response, ticket_export_rows, wants_csv
+from .forms import GroupBookingForm, ReportPeriodForm, TicketForm, TripSearchForm
 from .models import Ticket, Trip, Route, Destination, Bus, BusModel
-from .utils import (generate_ticket_number, calculate_final_ticket_price,
-                    validate_seat_number, get_available_seats, get_trip_occupancy_percentage)
+from .pagination import KeysetPaginationMixin
+from .utils import (aget_seat_map_state, aget_station_stats, book_seat, book_seats, calculate_ticket_prices,
+                    change_ticket_status, day_start, filter_tickets, get_available_seats,
+                    get_trip_occupancy_percentage, get_trips_off_schedule, seat_map_delta, seat_map_free_seats)
+
+logger = logging.getLogger(__name__)
 
 
 # ===== TICKET VIEWS =====
 
-class TicketListView(ListView):
+class TicketListView(KeysetPaginationMixin, ListView):
     model = Ticket
     template_name = 'bus_station/tickets/ticket_list.html'
     context_object_name = 'tickets'
     paginate_by = 20
+    keyset_ordering = ('-booking_time', '-id')
+
+    def get(self, request, *args, **kwargs):
+        if wants_csv(request):
+            # Експорт усіх відфільтрованих квитків, без пагінації
+            tickets = self.filter_queryset(Ticket.objects.order_by(*self.keyset_ordering))
+            return csv_response('tickets.csv', TICKET_EXPORT_HEADER, ticket_export_rows(tickets))
+        return super().get(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        # Фільтрація за статусом та датою рейсу
+        return filter_tickets(
+            queryset,
+            status=self.request.GET.get('status'),
+            trip_date=self.request.GET.get('trip_date')
+        )
 
     def get_queryset(self):
-        queryset = Ticket.objects.select_related(
-            'trip__route__destination',
-            'trip__bus__bus_model'
-        ).order_by('-booking_time')
-
-        # Фільтрація за статусом
-        status = self.request.GET.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-
-        # Фільтрація за датою рейсу
-        trip_date = self.request.GET.get('trip_date')
-        if trip_date:
-            queryset = queryset.filter(trip__date=trip_date)
-
-        return queryset
+        return self.filter_queryset(
+            Ticket.objects.select_related(
+                'trip__route__destination',
+                'trip__bus__bus_model'
+            ).order_by(*self.keyset_ordering)
+        )
 
 
 class TicketDetailView(DetailView):
@@ -53,9 +75,8 @@ class TicketDetailView(DetailView):
         )
 
 
-class TicketCreateView(CreateView):
-    model = Ticket
-    fields = ['trip', 'seat_number']
+class TicketCreateView(FormView):
+    form_class = TicketForm
     template_name = 'bus_station/tickets/ticket_create.html'
 
     def get_form(self, form_class=None):
@@ -67,28 +88,55 @@ class TicketCreateView(CreateView):
         return form
 
     def form_valid(self, form):
-        with transaction.atomic():
-            ticket = form.save(commit=False)
-            ticket.ticket_number = generate_ticket_number(ticket.trip)
-            ticket.status = 'booked'
+        # Єдина перевірка місця та збереження - у сервісі бронювання під блокуванням рейсу
+        try:
+            self.object = book_seat(
+                form.cleaned_data['trip'].pk,
+                form.cleaned_data['seat_number']
+            )
+        except ValidationError as e:
+            form.add_error('seat_number', e)
+            return self.form_invalid(form)
+
+        messages.success(self.request, f'Квиток {self.object.ticket_number} успішно заброньовано!')
+        return redirect(self.get_success_url())
 
-            # Перевірка доступності місця
-            is_valid, error_message = validate_seat_number(ticket.trip, ticket.seat_number)
-            if not is_valid:
-                form.add_error('seat_number', error_message)
-                return self.form_invalid(form)
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['seat_events_enabled'] = seat_events_supported(self.request)
+        return context
 
-            # Розрахунок ціни
-            sold_count = ticket.trip.get_sold_tickets_count()
-            ticket.price = calculate_final_ticket_price(ticket.trip, sold_count)
+    def get_success_url(self):
+        return reverse_lazy('ticket_detail', kwargs={'pk': self.object.pk})
 
-            ticket.save()
-            messages.success(self.request, f'Квиток {ticket.ticket_number} успішно заброньовано!')
+class GroupBookingView(FormView):
+    form_class = GroupBookingForm
+    template_name = 'bus_station/tickets/ticket_group_create.html'
+
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        # Обмежуємо вибір тільки майбутніми рейсами
+        form.fields['trip'].queryset = Trip.objects.filter(
+            date__gte=timezone.now().date()
+        ).select_related('route')
+        return form
 
-        return super().form_valid(form)
+    def form_valid(self, form):
+        # Усі місця бронюються разом або жодне
+        try:
+            tickets = book_seats(
+                form.cleaned_data['trip'].pk,
+                seat_numbers=form.cleaned_data['seats'],
+                count=form.cleaned_data['count']
+            )
+        except ValidationError as e:
+            form.add_error(None, e)
+            return self.form_invalid(form)
+
+        seats = ', '.join(str(ticket.seat_number) for ticket in tickets)
+        messages.success(self.request, f'Заброньовано {len(tickets)} квитків, місця: {seats}')
+        return redirect(f"{reverse('ticket_list')}?status=booked")
 
-    def get_success_url(self):
-        return reverse_lazy('ticket_detail', kwargs={'pk': self.object.pk})
 
 class TicketUpdateView(UpdateView):
     model = Ticket
@@ -96,28 +144,187 @@ class TicketUpdateView(UpdateView):
     fields = ['status']
 
     def form_valid(self, form):
-        ticket = form.save(commit=False)
-
-        if ticket.status == 'sold' and not ticket.sold_time:
-            ticket.sold_time = timezone.now()
+        # Зміна статусу - у сервісі під блокуванням рейсу: повернення скасованого
+        # квитка на місце, яке тим часом зайняли, показується як помилка форми
+        try:
+            self.object = change_ticket_status(self.object.pk, form.cleaned_data['status'])
+        except ValidationError as e:
+            form.add_error('status', e)
+            return self.form_invalid(form)
 
-        ticket.save()
-        messages.success(self.request, f'Статус квитка {ticket.ticket_number} оновлено!')
-        return super().form_valid(form)
+        messages.success(self.request, f'Статус квитка {self.object.ticket_number} оновлено!')
+        return redirect(self.get_success_url())
 
     def get_success_url(self):
         return reverse_lazy('ticket_detail', kwargs={'pk': self.object.pk})
 
 
 class GetAvailableSeatsView(View):
-    def get(self, request, trip_id):
-        trip = get_object_or_404(Trip, id=trip_id)
-        available_seats = get_available_seats(trip)
+    """
+    Вільні місця рейсу з кешованої карти; незмінена карта - 304
+    Асинхронний: під ASGI не займає потік на весь час запиту
+    """
+
+    async def get(self, request, trip_id):
+        state = await aget_seat_map_state(trip_id)
+        if state is None:
+            raise Http404("Рейс не знайдено")
+
+        etag = f'"{trip_id}-{state["version"]}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse({
+                'available_seats': seat_map_free_seats(state),
+                'total_seats': state['seats_count']
+            })
+        response.headers.setdefault('ETag', etag)
+        return response
+
+
+# Як часто SSE-з'єднання перевіряє версію карти, шле keep-alive і перепідключається
+SEAT_EVENTS_POLL_INTERVAL = 1
+SEAT_EVENTS_KEEPALIVE = 15
+SEAT_EVENTS_MAX_DURATION = 300
+
+
+def seat_events_supported(request):
+    """
+    SSE працює лише під ASGI: під WSGI Django буферизує асинхронний потік,
+    клієнт нічого не отримує, а з'єднання тримає воркер
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def _sse_event(event, data, event_id=None):
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\n{message}" if event_id else message
+
+
+async def _seat_map_events(trip_id, state):
+    """
+    Потік змін карти місць: спочатку повний стан, далі лише дельти
+    Версія карти читається з кешу, тож відкриті сторінки не навантажують базу
+    """
+    yield "retry: 3000\n\n"
+    yield _sse_event('snapshot', {
+        'available_seats': seat_map_free_seats(state),
+        'total_seats': state['seats_count']
+    }, state['version'])
+
+    loop = asyncio.get_running_loop()
+    started = last_sent = loop.time()
+    try:
+        while loop.time() - started < SEAT_EVENTS_MAX_DURATION:
+            await asyncio.sleep(SEAT_EVENTS_POLL_INTERVAL)
+            new_state = await aget_seat_map_state(trip_id)
+            if new_state is None:
+                yield _sse_event('deleted', {})
+                return
+
+            if new_state['version'] != state['version']:
+                occupied, freed = seat_map_delta(state, new_state)
+                yield _sse_event('seats', {
+                    'occupied': occupied,
+                    'freed': freed,
+                    'free_count': len(seat_map_free_seats(new_state)),
+                    'total_seats': new_state['seats_count']
+                }, new_state['version'])
+                state = new_state
+                last_sent = loop.time()
+            elif loop.time() - last_sent >= SEAT_EVENTS_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                last_sent = loop.time()
+    except asyncio.CancelledError:
+        # Клієнт відключився: ASGI-обробник Django скасовує потік, опитування карти припиняється
+        logger.debug("SSE рейсу %s: клієнт відключився", trip_id)
+        raise
+
+
+async def trip_seat_events(request, trip_id):
+    """Server-Sent Events зі змінами карти місць рейсу (потребує ASGI)"""
+    if not seat_events_supported(request):
+        # 204 - EventSource закривається без перепідключення, сторінка переходить на опитування
+        return HttpResponse(status=204)
+
+    state = await aget_seat_map_state(trip_id)
+    if state is None:
+        raise Http404("Рейс не знайдено")
+
+    response = StreamingHttpResponse(_seat_map_events(trip_id, state), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _trip_search_date(request):
+    """Дата пошуку, як її розуміє TripSearchForm: без параметра - сьогодні"""
+    return request.GET.get('date') or timezone.now().date().isoformat()
+
+
+def _trip_search_etag(request):
+    # Версія даних змінюється при кожному записі рейсів, квитків, маршрутів і цін;
+    # дата береться вже визначена, щоб запит без неї після півночі не отримав 304
+    params = request.GET.copy()
+    params['date'] = _trip_search_date(request)
+    return f'"{reports.get_data_version()}-{hashlib.md5(params.urlencode().encode()).hexdigest()}"'
+
+
+def _trip_search_last_modified(request):
+    last_modified = datetime.fromtimestamp(reports.get_data_version() / 1e9, tz=dt_timezone.utc)
+    if not request.GET.get('date'):
+        # Неявне "сьогодні" змінюється опівночі
+        last_modified = max(last_modified, day_start(timezone.now().date()))
+    return last_modified
+
+
+@method_decorator(condition(etag_func=_trip_search_etag, last_modified_func=_trip_search_last_modified),
+                  name='get')
+class TripSearchApiView(View):
+    """
+    Пошук рейсів за датою, пунктом прибуття та вікном відправлення (JSON)
+    Два запити незалежно від кількості рейсів: рейси разом з маршрутами
+    й автобусами та (за промаху кешу) ціна пального. Незмінений результат
+    повертається як 304 за ETag/Last-Modified без звернення до бази.
+    """
+
+    def get(self, request):
+        form = TripSearchForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400, json_dumps_params={'ensure_ascii': False})
+        params = form.cleaned_data
+
+        trips = Trip.objects.filter(date=params['date']).select_related(
+            'route__destination',
+            'route__bus_model',
+            'bus__bus_model'
+        ).order_by('route__departure_time', 'id')
+        if params['destination']:
+            trips = trips.filter(route__destination_id=params['destination'])
+        if params['departure_from']:
+            trips = trips.filter(route__departure_time__gte=params['departure_from'])
+        if params['departure_to']:
+            trips = trips.filter(route__departure_time__lte=params['departure_to'])
+
+        trips = list(trips)
+        prices = calculate_ticket_prices(trips)
 
         return JsonResponse({
-            'available_seats': available_seats,
-            'total_seats': trip.bus.bus_model.seats_count
-        })
+            'date': params['date'].isoformat(),
+            'count': len(trips),
+            'trips': [
+                {
+                    'id': trip.pk,
+                    'route_number': trip.route.number,
+                    'destination': trip.route.destination.name,
+                    'departure_time': trip.route.departure_time.strftime('%H:%M'),
+                    'arrival_time': trip.route.arrival_time.strftime('%H:%M'),
+                    'price': f"{prices[trip.pk]:.2f}",
+                    'free_seats': trip.free_seats,
+                    'total_seats': trip.bus.bus_model.seats_count,
+                }
+                for trip in trips
+            ]
+        }, json_dumps_params={'ensure_ascii': False})
 
 
 class ConfirmBookingView(View):
@@ -151,17 +358,18 @@ class CancelBookingView(View):
 
 # ===== ROUTE VIEWS =====
 
-class TripListView(ListView):
+class TripListView(KeysetPaginationMixin, ListView):
     model = Trip
     template_name = 'bus_station/trips/trip_list.html'
     context_object_name = 'trips'
     paginate_by = 20
+    keyset_ordering = ('date', 'route__departure_time', 'id')
 
     def get_queryset(self):
         queryset = Trip.objects.select_related(
             'route__destination',
             'bus__bus_model'
-        ).order_by('date', 'route__departure_time')
+        ).order_by(*self.keyset_ordering)
 
         # Фільтрація за датою
         date_filter = self.request.GET.get('date')
@@ -178,9 +386,32 @@ class TripListView(ListView):
 
         return queryset
 
+    async def get(self, request, *args, **kwargs):
+        """
+        Дані сторінки читаються асинхронним ORM; шаблон обробник Django
+        рендерить уже з готовими даними
+        """
+        self.object_list = self.get_queryset()
+        paginator, page, trips, is_paginated = await self.apaginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list)
+        )
+        destinations = [destination async for destination in Destination.objects.all()]
+        return self.render_to_response(self.get_context_data(
+            object_list=trips,
+            paginator=paginator,
+            page_obj=page,
+            is_paginated=is_paginated,
+            destinations=destinations
+        ))
+
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['destinations'] = Destination.objects.all()
+        if 'page_obj' in kwargs:
+            # Сторінку вже прочитано в get(): лише назви списку та фільтри
+            context = {'view': self, self.get_context_object_name(kwargs['object_list']): kwargs['object_list']}
+            context.update(kwargs)
+        else:
+            context = super().get_context_data(**kwargs)
+            context['destinations'] = Destination.objects.all()
         context['selected_date'] = self.request.GET.get('date', '')
         context['selected_destination'] = self.request.GET.get('destination', '')
         return context
@@ -204,7 +435,7 @@ class TripDetailView(DetailView):
         # Додаємо інформацію про вільні місця
         context['available_seats'] = get_available_seats(trip)
         context['occupancy_percentage'] = get_trip_occupancy_percentage(trip)
-        context['sold_tickets_count'] = trip.get_sold_tickets_count()
+        context['sold_tickets_count'] = trip.sold_count
         context['total_seats'] = trip.bus.bus_model.seats_count
 
         # Додаємо квитки цього рейсу
@@ -241,24 +472,52 @@ class RouteDetailView(DetailView):
 
 # ===== REPORT VIEWS =====
 
+def _cached_report(request, name, params, compute):
+    """Дані звіту з кешу; персонал може перерахувати їх через ?refresh=1"""
+    refresh = request.GET.get('refresh') == '1' and request.user.is_staff
+    return reports.cached_report(name, params, compute, refresh=refresh)
+
+
+def _report_period(request, **defaults):
+    """
+    Форма фільтрів звіту, параметри періоду та його опис
+    Параметри обмежені ReportPeriodForm.MAX_SPAN_DAYS і входять у ключ кешу
+    """
+    filter_form = ReportPeriodForm(request.GET or None, **defaults)
+    date_from, date_to, destination = filter_form.get_period()
+    params = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'destination': destination.pk if destination else None
+    }
+    period = f"{date_from.strftime('%d.%m.%Y')} - {date_to.strftime('%d.%m.%Y')}"
+    if destination:
+        period += f", {destination.name}"
+    return filter_form, params, period
+
+
 def report_most_popular_destinations(request):
     """1. Пункти прибуття, до яких здійснено найбільше рейсів"""
 
-    # За останній місяць
-    last_month = timezone.now().date() - timedelta(days=30)
+    # За замовчуванням - останній місяць
+    filter_form, params, period = _report_period(request, default_days=30)
 
-    popular_destinations = Trip.objects.filter(
-        date__gte=last_month
-    ).values(
-        'route__destination__name'
-    ).annotate(
-        trip_count=Count('id')
-    ).order_by('-trip_count')
+    popular_destinations = _cached_report(
+        request, 'popular_destinations', params,
+        lambda: reports.popular_destinations(**params)
+    )
+    if wants_csv(request):
+        return csv_response(
+            'popular_destinations.csv',
+            ['Пункт прибуття', 'Кількість рейсів'],
+            ([row['destination__name'], row['trip_count']] for row in popular_destinations)
+        )
 
     context = {
         'report_title': 'Найпопулярніші пункти прибуття',
         'destinations': popular_destinations,
-        'period': 'за останній місяць'
+        'filter_form': filter_form,
+        'period': period
     }
     return render(request, 'bus_station/reports/report_popular_destinations.html', context)
 
@@ -266,22 +525,49 @@ def report_most_popular_destinations(request):
 def report_trip_dates_coordination(request):
     """2. Узгодження дат виїзду з днями здійснення рейсів"""
 
-    # Знаходимо рейси, де дата не відповідає дням тижня маршруту
-    problematic_trips = []
-    for trip in Trip.objects.select_related('route').all():
-        route_days = [int(day.strip()) for day in trip.route.days_of_week.split(',')]
-        trip_weekday = trip.date.isoweekday()  # 1-Понеділок, 7-Неділя
+    # За замовчуванням - місяць назад і два місяці сформованого розкладу вперед
+    filter_form, params, period = _report_period(request, default_days=30, default_days_ahead=60)
+
+    def find_problematic_trips():
+        # Рейси, де дата не відповідає дням тижня маршруту (одним запитом)
+        trips = get_trips_off_schedule().filter(
+            date__range=(params['date_from'], params['date_to'])
+        )
+        if params['destination']:
+            trips = trips.filter(route__destination=params['destination'])
 
-        if trip_weekday not in route_days:
-            problematic_trips.append({
+        day_names = dict(Route.DAYS_OF_WEEK)
+        return [
+            {
                 'trip': trip,
                 'scheduled_days': trip.route.get_days_of_week_display(),
-                'actual_day': trip.date.strftime('%A')
-            })
+                'actual_day': day_names[trip.date.isoweekday()]
+            }
+            for trip in trips.select_related('route__destination').order_by('date')
+        ]
+
+    problematic_trips = _cached_report(request, 'trip_dates', params, find_problematic_trips)
+    if wants_csv(request):
+        return csv_response(
+            'trip_dates.csv',
+            ['Рейс', 'Дата', 'Заплановані дні', 'Фактичний день', 'Пункт призначення'],
+            (
+                [
+                    problem['trip'].route.number,
+                    problem['trip'].date.strftime('%d.%m.%Y'),
+                    problem['scheduled_days'],
+                    problem['actual_day'],
+                    problem['trip'].route.destination.name
+                ]
+                for problem in problematic_trips
+            )
+        )
 
     context = {
         'report_title': 'Узгодження дат рейсів',
-        'problematic_trips': problematic_trips
+        'problematic_trips': problematic_trips,
+        'filter_form': filter_form,
+        'period': period
     }
     return render(request, 'bus_station/reports/report_trip_dates.html', context)
 
@@ -289,77 +575,49 @@ def report_trip_dates_coordination(request):
 # bus_station/views.py
 
 def report_average_bus_occupancy(request):
-    """3. Середня наповненість автобусів по кожному рейсу за останній місяць"""
+    """3. Середня наповненість автобусів по кожному рейсу за період"""
 
-    last_month = timezone.now().date() - timedelta(days=30)
+    filter_form, params, period = _report_period(request, default_days=30)
 
-    # Отримуємо дані по рейсах за останній місяць
-    trips_data = Trip.objects.filter(
-        date__gte=last_month
-    ).select_related('route', 'bus__bus_model').annotate(
-        sold_tickets_count=Count('ticket', filter=Q(ticket__status='sold'))
+    occupancy_data = _cached_report(
+        request, 'average_bus_occupancy', params,
+        lambda: reports.average_bus_occupancy(**params)
     )
-
-    # Групуємо дані вручну
-    from collections import defaultdict
-    route_data = defaultdict(list)
-
-    for trip in trips_data:
-        key = (trip.route.number, trip.route.destination.name, trip.bus.bus_model.name)
-        route_data[key].append({
-            'sold_tickets': trip.sold_tickets_count,
-            'total_seats': trip.bus.bus_model.seats_count
-        })
-
-    # Обчислюємо середнє для кожної групи
-    occupancy_data = []
-    for key, trips in route_data.items():
-        route_number, destination_name, bus_model_name = key
-
-        total_sold = sum(trip['sold_tickets'] for trip in trips)
-        total_trips = len(trips)
-        avg_occupancy = total_sold / total_trips if total_trips > 0 else 0
-
-        # Визначаємо кількість місць (беремо з першого рейсу, оскільки вони однакові для марки)
-        total_seats = trips[0]['total_seats'] if trips else 0
-        occupancy_percentage = (avg_occupancy / total_seats) * 100 if total_seats > 0 else 0
-
-        occupancy_data.append({
-            'route_number': route_number,
-            'destination_name': destination_name,
-            'bus_model_name': bus_model_name,
-            'avg_occupancy': round(avg_occupancy, 1),
-            'total_trips': total_trips,
-            'occupancy_percentage': round(occupancy_percentage, 1)
-        })
-
-    # Сортуємо за номером рейсу
-    occupancy_data.sort(key=lambda x: x['route_number'])
+    if wants_csv(request):
+        return csv_response(
+            'bus_occupancy.csv',
+            ['Рейс', 'Пункт призначення', 'Марка автобуса', 'Кількість рейсів',
+             'Середня наповненість', 'Відсоток заповненості'],
+            (
+                [item['route_number'], item['destination_name'], item['bus_model_name'],
+                 item['total_trips'], item['avg_occupancy'], item['occupancy_percentage']]
+                for item in occupancy_data
+            )
+        )
 
     context = {
         'report_title': 'Середня наповненість автобусів',
         'occupancy_data': occupancy_data,
-        'period': 'за останній місяць'
+        'filter_form': filter_form,
+        'period': period
     }
     return render(request, 'bus_station/reports/report_occupancy.html', context)
 
 def report_busiest_days(request):
     """4. Дні тижня, на які припадає найбільше/найменше рейсів"""
 
-    days_data = Trip.objects.values(
-        'date__week_day'
-    ).annotate(
-        trip_count=Count('id')
-    ).order_by('date__week_day')
-
-    # Мапінг номерів днів тижня Django на назви
-    day_names = {
-        1: 'Неділя', 2: 'Понеділок', 3: 'Вівторок',
-        4: 'Середа', 5: 'Четвер', 6: 'П\'ятниця', 7: 'Субота'
-    }
+    filter_form, params, period = _report_period(request, default_days=90)
 
-    for day in days_data:
-        day['day_name'] = day_names.get(day['date__week_day'], 'Невідомо')
+    days_data = _cached_report(
+        request, 'busiest_days', params,
+        lambda: reports.busiest_days(**params)
+    )
+    if wants_csv(request):
+        return csv_response(
+            'busiest_days.csv',
+            ['День тижня', 'Кількість рейсів'],
+            ([day['day_name'], day['trip_count']] for day in days_data)
+        )
 
     if days_data:
         busiest_day = max(days_data, key=lambda x: x['trip_count'])
@@ -371,7 +629,9 @@ def report_busiest_days(request):
         'report_title': 'Завантаженість по днях тижня',
         'days_data': days_data,
         'busiest_day': busiest_day,
-        'quietest_day': quietest_day
+        'quietest_day': quietest_day,
+        'filter_form': filter_form,
+        'period': period
     }
     return render(request, 'bus_station/reports/report_busiest_days.html', context)
 
@@ -379,23 +639,29 @@ def report_busiest_days(request):
 def report_rarest_trips(request):
     """5. Рейси, які здійснюються найрідше"""
 
-    # Рейси з найменшою кількістю поїздок за останні 3 місяці
-    three_months_ago = timezone.now().date() - timedelta(days=90)
+    # Рейси з найменшою кількістю поїздок (за замовчуванням - за останні 3 місяці)
+    filter_form, params, period = _report_period(request, default_days=90)
 
-    rare_trips = Trip.objects.filter(
-        date__gte=three_months_ago
-    ).values(
-        'route__number',
-        'route__destination__name',
-        'route__days_of_week'
-    ).annotate(
-        trip_count=Count('id')
-    ).order_by('trip_count')[:10]  # Топ-10 найрідших
+    rare_trips = _cached_report(
+        request, 'rarest_trips', params,
+        lambda: reports.rarest_trips(**params)  # Топ-10 найрідших
+    )
+    if wants_csv(request):
+        return csv_response(
+            'rarest_trips.csv',
+            ['Рейс', 'Пункт призначення', 'Дні виїзду', 'Кількість рейсів'],
+            (
+                [trip['route__number'], trip['route__destination__name'],
+                 trip['route__days_of_week'], trip['trip_count']]
+                for trip in rare_trips
+            )
+        )
 
     context = {
         'report_title': 'Найрідші рейси',
         'rare_trips': rare_trips,
-        'period': 'за останні 3 місяці'
+        'filter_form': filter_form,
+        'period': period
     }
     return render(request, 'bus_station/reports/report_rarest_trips.html', context)
 
@@ -404,14 +670,22 @@ def report_rarest_trips(request):
 def report_revenue_by_destination(request):
     """6. Виручка від продажу квитків по кожному пункту прибуття"""
 
-    revenue_data = Ticket.objects.filter(
-        status='sold'
-    ).values(
-        'trip__route__destination__name'
-    ).annotate(
-        total_revenue=Sum('price'),
-        tickets_sold=Count('id')
-    ).order_by('-total_revenue')
+    # Продажі за період (за замовчуванням - останній місяць)
+    filter_form, params, period = _report_period(request, default_days=30)
+
+    revenue_data = _cached_report(
+        request, 'revenue_by_destination', params,
+        lambda: reports.revenue_by_destination(**params)
+    )
+    if wants_csv(request):
+        return csv_response(
+            'revenue_by_destination.csv',
+            ['Пункт призначення', 'Кількість проданих квитків', 'Загальна виручка'],
+            (
+                [item['trip__route__destination__name'], item['tickets_sold'], f"{item['total_revenue']:.2f}"]
+                for item in revenue_data
+            )
+        )
 
     # Обчислити загальні суми
     total_tickets = sum(item['tickets_sold'] for item in revenue_data)
@@ -422,6 +696,8 @@ def report_revenue_by_destination(request):
         'revenue_data': revenue_data,
         'total_tickets': total_tickets,
         'total_revenue': total_revenue,
+        'filter_form': filter_form,
+        'period': period
     }
     return render(request, 'bus_station/reports/report_revenue.html', context)
 
@@ -473,19 +749,19 @@ class DestinationListView(ListView):
 
 # ===== HOME VIEW =====
 
-def home(request):
+async def home(request):
     """Головна сторінка системи"""
-    # Статистика для головної сторінки
+    # Статистика для головної сторінки (спільний кеш з context processor)
     today = timezone.now().date()
-    today_trips = Trip.objects.filter(date=today).count()
-    today_tickets = Ticket.objects.filter(trip__date=today, status='sold').count()
+    stats = await aget_station_stats(today)
 
     context = {
-        'today_trips': today_trips,
-        'today_tickets': today_tickets,
+        'today_trips': stats['trips'],
+        'today_tickets': stats['tickets'],
         'today_date': today
     }
-    return render(request, 'bus_station/home.html', context)
+    # TemplateResponse рендериться обробником Django поза циклом подій
+    return TemplateResponse(request, 'bus_station/home.html', context)
 
 
 def handler404(request, exception):
@@ -94,6 +94,53 @@ DATABASES = {
 }
 
 
+# Кеш має бути спільним для всіх воркерів і процесів (веб, run_expiry_worker,
+# команди): через нього розходяться ціна пального, карти місць і версія даних звітів.
+# За замовчуванням - таблиця в базі (python manage.py createcachetable),
+# у продакшені - Redis або Memcached (CACHE_BACKEND та CACHE_LOCATION).
+# Локальний для процесу LocMemCache підходить лише для одного процесу розробки.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'bus_station_cache'),
+    }
+}
+if CACHE_BACKEND.endswith('.DatabaseCache'):
+    # Карта місць кожного рейсу - окремий запис; стандартні 300 записів замало
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 100000}
+
+# Скільки секунд воркер тримає ціну пального в пам'яті без звернення до кешу
+FUEL_PRICE_LOCAL_CACHE_TTL = 5
+
+# Скільки секунд ціна пального живе у спільному кеші до повторного читання з бази
+FUEL_PRICE_CACHE_TTL = 300
+
+# Скільки секунд кешується денна статистика станції (рейси та продані квитки)
+STATION_STATS_CACHE_TTL = 60
+
+# Скільки секунд карта місць рейсу живе в кеші до повторного читання з бази
+SEAT_MAP_CACHE_TTL = 30
+
+# Скільки номерів квитків процес забирає з лічильника за одне звернення до бази
+TICKET_NUMBER_BLOCK_SIZE = 100
+
+# Скільки секунд живе версія даних звітів. Зі спільним кешем запис у будь-якому
+# процесі (веб, run_expiry_worker, команди) змінює версію, і старі результати звітів
+# одразу перестають читатися; з локальним для процесу кешем - лише після цього TTL
+REPORT_DATA_VERSION_TTL = 300
+
+# Скільки секунд зберігається результат кожного звіту (обмежує пам'ять кешу)
+REPORT_CACHE_TTLS = {
+    'popular_destinations': 600,
+    'trip_dates': 300,
+    'average_bus_occupancy': 600,
+    'busiest_days': 3600,
+    'rarest_trips': 1800,
+    'revenue_by_destination': 300,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 